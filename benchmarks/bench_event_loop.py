@@ -0,0 +1,94 @@
+"""Compare message dispatch and database round-trip throughput on asyncio's default loop and uvloop.
+
+Run from the repository root: python -m benchmarks.bench_event_loop
+Uses a temporary SQLite database unless DB_BACKEND is set, in which case the configured backend is used.
+"""
+import os
+import time
+import asyncio
+import tempfile
+from types import SimpleNamespace
+
+from database import Database, create_backend
+from database.backends.sqlite import SQLiteBackend
+from message_pipeline import MessagePipeline, PRIORITY_AUTOMOD, PRIORITY_STATISTICS
+
+MESSAGES = 20000
+QUERIES = 2000
+CONTENTS = [
+    "hello everyone, how is the modding going?",
+    "check site#42 please",
+    "join my server discord.gg/abc123",
+    "https://x.com/hytale/status/1234567890",
+    ".tag quic",
+]
+
+def create_pipeline() -> MessagePipeline:
+    """A pipeline shaped like the bot's: a buffering handler, prefiltered handlers and one that awaits"""
+    activity = {}
+
+    async def statistics(ctx):
+        activity[(ctx.guild_id, ctx.author_id)] = time.time()
+
+    async def automod(ctx):
+        return False
+
+    async def replies(ctx):
+        await asyncio.sleep(0)
+
+    pipeline = MessagePipeline()
+    pipeline.register("statistics", statistics, prefilter=lambda ctx: ctx.guild_id is not None, priority=PRIORITY_STATISTICS)
+    pipeline.register("automod", automod, prefilter=lambda ctx: bool(ctx.scan.invites), priority=PRIORITY_AUTOMOD)
+    pipeline.register("tags", replies, prefilter=lambda ctx: ctx.content.startswith("."))
+    pipeline.register("gh-issues", replies, prefilter=lambda ctx: bool(ctx.scan.github_refs), concurrent=True)
+    pipeline.register("utils", replies, prefilter=lambda ctx: bool(ctx.scan.twitter_paths), concurrent=True)
+    return pipeline
+
+def fake_message(index: int):
+    return SimpleNamespace(
+        content=CONTENTS[index % len(CONTENTS)],
+        author=SimpleNamespace(id=index % 500, bot=False, roles=()),
+        channel=SimpleNamespace(id=1),
+        guild=SimpleNamespace(id=1)
+    )
+
+async def bench_dispatch() -> float:
+    """Messages per second, with every dispatch in its own task like discord.py schedules listeners"""
+    pipeline = create_pipeline()
+    messages = [fake_message(index) for index in range(MESSAGES)]
+    start = time.perf_counter()
+    await asyncio.gather(*(asyncio.create_task(pipeline.dispatch(message)) for message in messages))
+    return MESSAGES / (time.perf_counter() - start)
+
+async def bench_database(path: str) -> float:
+    """Uncached queries per second through the Database layer"""
+    backend = create_backend() if os.getenv("DB_BACKEND") else SQLiteBackend(path)
+    database = Database(backend)
+    await database.init_db()
+    try:
+        start = time.perf_counter()
+        for index in range(QUERIES):
+            await database.get_warnings(1, index)
+        return QUERIES / (time.perf_counter() - start)
+    finally:
+        await database.close()
+
+async def run(path: str):
+    return await bench_dispatch(), await bench_database(path)
+
+def main():
+    loops = [("asyncio", None)]
+    try:
+        import uvloop
+        loops.append(("uvloop", uvloop.new_event_loop))
+    except ImportError:
+        print("uvloop is not installed, only benchmarking the default asyncio loop")
+
+    with tempfile.TemporaryDirectory() as directory:
+        for name, loop_factory in loops:
+            with asyncio.Runner(loop_factory=loop_factory) as runner:
+                dispatch, queries = runner.run(run(os.path.join(directory, f"{name}.db")))
+            print(f"{name:>8}: {dispatch:>9.0f} messages/s dispatched, {queries:>7.0f} queries/s")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+"""Compare message_scanner.scan against the per-cog regexes it replaced.
+
+Run from the repository root: python -m benchmarks.bench_message_scanner
+"""
+import re
+import timeit
+
+from message_scanner import scan
+
+SAMPLES = [
+    "hello everyone, how is the modding going?",
+    "anyone know how to register a custom block?",
+    "check site#42 and robot#17 please",
+    "fixed in patcher#a1b2c3d",
+    "https://discord.com/channels/1440173445039132724/1440173445039132727/1442000000000000000",
+    "look at this https://x.com/hytale/status/1234567890 and https://twitter.com/hytale/status/1",
+    "https://fxtwitter.com/hytale/status/1 https://nitter.net/hytale/status/2",
+    "join my server discord.gg/abc123",
+    "docs are at https://hytalemodding.dev/en/docs/guides/setup",
+    "lol " * 50,
+]
+
+def legacy(content):
+    """What AutoMod, Utils and GitHubIssues each did on every message"""
+    invite = re.search(r"(https?:\/\/)?(www\.)?(discord\.gg|discordapp\.com\/invite)\/[a-zA-Z0-9]+", content)
+    links = re.findall(r'https://discord\.com/channels/(\d+)/(\d+)/(\d+)', content)
+    twitter_links = []
+    for pattern in [
+        r'https://(www\.)?twitter\.com/\S+',
+        r'https://(www\.)?x\.com/\S+',
+        r'https://vxtwitter\.com/\S+',
+        r'https://fxtwitter\.com/\S+',
+        r'https://nitter\.net/\S+',
+    ]:
+        for match in re.findall(pattern, content):
+            if 'twitter.com' in match or 'x.com' in match:
+                path = re.search(r'(?:twitter|x)\.com(/\S+)', match)
+                if path:
+                    twitter_links.append(f"https://xcancel.com{path.group(1)}")
+            else:
+                twitter_links.append(re.sub(r'https://[^/]+', 'https://xcancel.com', match))
+    refs = re.findall(r'(\w+)#([a-fA-F0-9]+|\d+)', content)
+    return invite, links, twitter_links, refs
+
+def scanned(content):
+    result = scan(content)
+    twitter_links = [f"https://xcancel.com{path}" for path in result.twitter_paths]
+    return result.invites, result.message_links, twitter_links, result.github_refs
+
+def main():
+    number = 20000
+    for name, func in (("per-cog regexes", legacy), ("message_scanner", scanned)):
+        seconds = timeit.timeit(lambda: [func(sample) for sample in SAMPLES], number=number)
+        per_message = seconds / (number * len(SAMPLES)) * 1e6
+        print(f"{name:>16}: {seconds:.3f}s total, {per_message:.2f}µs per message")
+
+if __name__ == '__main__':
+    main()
@@ -1,22 +1,33 @@
 import discord
 from discord.ext import commands
 
+from message_pipeline import MessageContext, PRIORITY_AUTO_THREAD
+
+SHOWCASE_CHANNEL_ID = 1440185755745124503
+
 class AutoThread(commands.Cog):
     def __init__(self, bot):
         self.bot: commands.Bot = bot
         self._last_member = None
 
-    @commands.Cog.listener()
-    async def on_message(self, message: discord.Message):
-        if message.author.bot:
-            return
-        
-        if message.channel.id == 1440185755745124503:
-            await message.add_reaction('🔥')
-            await message.create_thread(
-                name=f"Discussion - {message.author.display_name}",
-                reason="Auto-thread for discussion channel"
-            )
+    async def cog_load(self):
+        self.bot.message_pipeline.register(
+            "auto-thread",
+            self.handle_message,
+            prefilter=lambda ctx: ctx.channel_id == SHOWCASE_CHANNEL_ID,
+            priority=PRIORITY_AUTO_THREAD
+        )
+
+    async def cog_unload(self):
+        self.bot.message_pipeline.unregister("auto-thread")
+
+    async def handle_message(self, ctx: MessageContext):
+        message = ctx.message
+        await message.add_reaction('🔥')
+        await message.create_thread(
+            name=f"Discussion - {message.author.display_name}",
+            reason="Auto-thread for discussion channel"
+        )
 
 
     @commands.Cog.listener()
@@ -2,7 +2,8 @@ import discord
 from discord import app_commands
 from discord.ext import commands
 
-import re
+from message_pipeline import MessageContext, PRIORITY_AUTOMOD
+from message_scanner import INVITE_PATTERN
 
 WHITELISTED_ROLE_IDS = [
     1440793371529449614, # Staff Team
@@ -16,25 +17,34 @@ class AutoMod(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
 
-    @commands.Cog.listener()
-    async def on_message(self, message: discord.Message):
-        """Automatically delete messages containing discord links."""
-        if message.author.bot:
-            return
+    async def cog_load(self):
+        self.bot.message_pipeline.register(
+            "automod",
+            self.handle_message,
+            prefilter=lambda ctx: ctx.guild_id is not None and bool(ctx.scan.invites),
+            priority=PRIORITY_AUTOMOD
+        )
+
+    async def cog_unload(self):
+        self.bot.message_pipeline.unregister("automod")
 
-        if any(role.id in WHITELISTED_ROLE_IDS for role in message.author.roles) or message.author.guild_permissions.administrator:
-            return
+    async def handle_message(self, ctx: MessageContext) -> bool:
+        """Automatically delete messages containing discord links."""
+        message = ctx.message
+        if not ctx.role_ids.isdisjoint(WHITELISTED_ROLE_IDS) or ctx.is_admin:
+            return False
 
-        DISCORD_INVITE_URL_REGEX = r"(https?:\/\/)?(www\.)?(discord\.gg|discordapp\.com\/invite)\/[a-zA-Z0-9]+"
-        if re.search(DISCORD_INVITE_URL_REGEX, message.content):
+        if ctx.scan.invites:
             await message.delete()
             await message.channel.send(
                 f"{message.author.mention}, posting Discord invite links is not allowed! Please DM <@702385226407608341> if you would like to post an invite to your server.", delete_after=30
             )
-            clean_content = re.sub(DISCORD_INVITE_URL_REGEX, "[invite link removed]", message.content)
+            clean_content = INVITE_PATTERN.sub("[invite link removed]", message.content)
             await message.channel.send(
                 f"Cleaned message from {message.author.mention}: \n\n{clean_content}"
-            ) 
+            )
+            return True
+        return False
 
 
 async def setup(bot):
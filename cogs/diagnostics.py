@@ -0,0 +1,91 @@
+import discord
+from discord import app_commands
+from discord.ext import commands
+
+import logging
+
+log = logging.getLogger(__name__)
+
+STAFF_ROLE_ID = 1440793371529449614
+
+class Diagnostics(commands.Cog):
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+
+    @app_commands.command(name="dbstats", description="Show database method latency statistics (staff only)")
+    @app_commands.checks.has_role(STAFF_ROLE_ID)
+    async def db_stats(self, interaction: discord.Interaction):
+        db = self.bot.database
+        stats = db.query_stats()
+
+        if not stats:
+            return await interaction.response.send_message("No database method calls have been recorded yet.", ephemeral=True)
+
+        slowest = sorted(stats.items(), key=lambda item: item[1]['p95_ms'], reverse=True)[:20]
+        lines = [f"{'method':<26} {'calls':>6} {'p50':>7} {'p95':>7} {'p99':>7} {'rows':>7}"]
+        for name, summary in slowest:
+            lines.append(
+                f"{name[:26]:<26} {summary['count']:>6} {summary['p50_ms']:>7.1f} {summary['p95_ms']:>7.1f} "
+                f"{summary['p99_ms']:>7.1f} {summary['rows']:>7}"
+            )
+
+        embed = discord.Embed(
+            title="🗄️ Database Method Statistics",
+            description="```\n" + "\n".join(lines) + "\n```",
+            color=discord.Color.blue()
+        )
+
+        config_cache = db.config_cache_stats()
+        follower_cache = db.follower_cache_stats()
+        embed.add_field(name="Config Cache", value=f"{config_cache['hits']} hits / {config_cache['misses']} misses", inline=True)
+        embed.add_field(name="Follower Index", value=f"{follower_cache['hits']} hits / {follower_cache['misses']} misses", inline=True)
+        upvotes = db.upvote_stats()
+        embed.add_field(name="Upvote Counters", value=f"{upvotes['showcases']} showcases, {upvotes['dirty']} unflushed", inline=True)
+        embed.add_field(name="Open Tickets", value=str(db.open_ticket_stats()['open_tickets']), inline=True)
+        write_queue = db.write_queue.stats()
+        embed.add_field(name="Write Queue", value=f"{write_queue['queued']}/{write_queue['maxsize']} queued, {write_queue['written']} written in {write_queue['batches']} batches, {write_queue['failed']} failed, {write_queue['dropped']} dropped", inline=False)
+        startup = getattr(self.bot, "startup_timings", {})
+        if startup:
+            embed.add_field(name="Startup", value=", ".join(f"{phase}: {duration * 1000:.0f}ms" for phase, duration in startup.items()), inline=False)
+        embed.add_field(name="Backend", value=", ".join(f"{key}: {value}" for key, value in db.backend.stats().items()), inline=False)
+        embed.set_footer(text=f"Slow query threshold: {db.query_metrics.slow_query_threshold * 1000:.0f}ms • latencies in ms, including cache hits")
+
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
+    @app_commands.command(name="loopstats", description="Show event loop lag and the slowest blocking callbacks (staff only)")
+    @app_commands.describe(reset="Clear the recorded lag and slow callbacks after showing them")
+    @app_commands.checks.has_role(STAFF_ROLE_ID)
+    async def loop_stats(self, interaction: discord.Interaction, reset: bool = False):
+        monitor = self.bot.loop_monitor
+        lag = monitor.lag.summary()
+
+        lines = [f"{'handler':<30} {'callback':<30} {'calls':>5} {'max':>7} {'total':>8}"]
+        for handler, callback, stats in monitor.worst_offenders(limit=15):
+            lines.append(
+                f"{handler[-30:]:<30} {callback[-30:]:<30} {stats.count:>5} {stats.max_time * 1000:>7.0f} {stats.total_time * 1000:>8.0f}"
+            )
+
+        embed = discord.Embed(
+            title="⏱️ Event Loop Statistics",
+            description="```\n" + "\n".join(lines) + "\n```" if len(lines) > 1 else (
+                "No slow callbacks have been recorded." if monitor.attribute_callbacks
+                else "Slow callback attribution is off, set LOOP_ATTRIBUTE_CALLBACKS to enable it."
+            ),
+            color=discord.Color.blue()
+        )
+        embed.add_field(name="Loop Lag", value=f"now {monitor.last_lag * 1000:.1f}ms, p50 {lag['p50_ms']:.1f}ms, p95 {lag['p95_ms']:.1f}ms, p99 {lag['p99_ms']:.1f}ms, max {lag['max_ms']:.1f}ms", inline=False)
+        if monitor.recent:
+            recent = [
+                f"<t:{int(timestamp)}:R> {callback} ({handler}) {duration * 1000:.0f}ms"
+                for timestamp, handler, callback, duration in list(monitor.recent)[-5:]
+            ]
+            embed.add_field(name="Most Recent", value="\n".join(reversed(recent))[:1024], inline=False)
+        embed.set_footer(text=f"Slow callback threshold: {monitor.slow_callback_threshold * 1000:.0f}ms • latencies in ms")
+
+        if reset:
+            monitor.reset()
+
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
+async def setup(bot):
+    await bot.add_cog(Diagnostics(bot))
@@ -3,6 +3,10 @@ from discord.ext import commands
 import aiohttp
 import re
 
+from message_pipeline import MessageContext, PRIORITY_GITHUB_REFS
+
+COMMIT_SHA_PATTERN = re.compile(r'^[a-fA-F0-9]+$')
+
 class GitHubIssues(commands.Cog):
     def __init__(self, bot):
         self.bot: commands.Bot = bot
@@ -25,13 +29,21 @@ class GitHubIssues(commands.Cog):
             'commit': '📝'
         }
 
-    @commands.Cog.listener()
-    async def on_message(self, message):
-        if message.author.bot:
-            return
-        
-        pattern = r'(\w+)#([a-fA-F0-9]+|\d+)'
-        matches = re.findall(pattern, message.content)
+    async def cog_load(self):
+        self.bot.message_pipeline.register(
+            "gh-issues",
+            self.handle_message,
+            prefilter=lambda ctx: bool(ctx.scan.github_refs),
+            priority=PRIORITY_GITHUB_REFS,
+            concurrent=True
+        )
+
+    async def cog_unload(self):
+        self.bot.message_pipeline.unregister("gh-issues")
+
+    async def handle_message(self, ctx: MessageContext):
+        message = ctx.message
+        matches = ctx.scan.github_refs
         
         if not matches:
             return
@@ -57,7 +69,7 @@ class GitHubIssues(commands.Cog):
                 repo_path = self.known_repos[repo_name]
                 
                 try:
-                    if re.match(r'^[a-fA-F0-9]+$', identifier) and len(identifier) >= 7:
+                    if COMMIT_SHA_PATTERN.match(identifier) and len(identifier) >= 7:
                         url = f"{self.github_api_base}/{repo_path}/commits/{identifier}"
                         async with session.get(url) as response:
                             if response.status == 200:
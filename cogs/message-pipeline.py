@@ -0,0 +1,15 @@
+import discord
+from discord.ext import commands
+
+class MessagePipelineListener(commands.Cog):
+    """The bot's single on_message listener, feeding every message through bot.message_pipeline"""
+
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+
+    @commands.Cog.listener()
+    async def on_message(self, message: discord.Message):
+        await self.bot.message_pipeline.dispatch(message)
+
+async def setup(bot):
+    await bot.add_cog(MessagePipelineListener(bot))
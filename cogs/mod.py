@@ -2,6 +2,72 @@ import discord
 from discord import app_commands
 from discord.ext import commands
 from datetime import datetime, timedelta
+from typing import AsyncIterator, Callable, Dict, List
+import math
+import asyncio
+
+PAGE_SIZE = 10
+
+def format_timestamp(value: datetime) -> str:
+    return value.strftime("%Y-%m-%d %H:%M UTC")
+
+class PaginatedEmbedView(discord.ui.View):
+    """Pages through rows from a database page iterator, fetching the next page only when it is requested"""
+
+    def __init__(self, author_id: int, pages: AsyncIterator[List[Dict]], total: int,
+                 render: Callable[[List[Dict], int, int], discord.Embed]):
+        super().__init__(timeout=180)
+        self.author_id = author_id
+        self.page_iterator = pages
+        self.pages: List[List[Dict]] = []
+        self.page_count = max(1, math.ceil(total / PAGE_SIZE))
+        self.render = render
+        self.index = 0
+        # Two quick presses must not advance the same async generator concurrently
+        self.lock = asyncio.Lock()
+
+    async def first_page(self) -> discord.Embed:
+        """Fetch and render the first page"""
+        self.pages.append(await anext(self.page_iterator, []))
+        self._update_buttons()
+        return self.render(self.pages[0], 1, self.page_count)
+
+    def _update_buttons(self):
+        self.previous_page.disabled = self.index == 0
+        self.next_page.disabled = self.index + 1 >= self.page_count
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        return interaction.user.id == self.author_id
+
+    async def on_timeout(self):
+        async with self.lock:
+            await self.page_iterator.aclose()
+
+    @discord.ui.button(label="◀ Previous", style=discord.ButtonStyle.secondary)
+    async def previous_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        async with self.lock:
+            if self.index == 0:
+                return await interaction.response.edit_message(view=self)
+            self.index -= 1
+            self._update_buttons()
+            await interaction.response.edit_message(embed=self.render(self.pages[self.index], self.index + 1, self.page_count), view=self)
+
+    @discord.ui.button(label="Next ▶", style=discord.ButtonStyle.secondary)
+    async def next_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        async with self.lock:
+            if self.index + 1 >= len(self.pages):
+                if self.index + 1 >= self.page_count:
+                    return await interaction.response.edit_message(view=self)
+                page = await anext(self.page_iterator, None)
+                if not page:
+                    self.page_count = len(self.pages)
+                    self._update_buttons()
+                    return await interaction.response.edit_message(view=self)
+                self.pages.append(page)
+
+            self.index += 1
+            self._update_buttons()
+            await interaction.response.edit_message(embed=self.render(self.pages[self.index], self.index + 1, self.page_count), view=self)
 
 class Moderation(commands.Cog):
     def __init__(self, bot):
@@ -33,11 +99,7 @@ class Moderation(commands.Cog):
         if member.top_role >= interaction.user.top_role and interaction.user != interaction.guild.owner:
             return await interaction.response.send_message("❌ You cannot warn someone with a higher or equal role.", ephemeral=True)
         
-        warning_id = await self.db.add_warning(interaction.guild.id, member.id, interaction.user.id, reason)
-        await self.db.log_action(interaction.guild.id, "warn", member.id, interaction.user.id, reason)
-        
-        warnings = await self.db.get_warnings(interaction.guild.id, member.id)
-        warning_count = len(warnings)
+        warning_id, warning_count = await self.db.record_warning(interaction.guild.id, member.id, interaction.user.id, reason)
         reason = f"{rule} - {reason}"
         
         embed = discord.Embed(
@@ -70,39 +132,40 @@ class Moderation(commands.Cog):
     @app_commands.command(name="warnings", description="Check warnings for a user")
     @app_commands.checks.has_permissions(moderate_members=True)
     async def warnings(self, interaction: discord.Interaction, member: discord.Member):
-        warnings = await self.db.get_warnings(interaction.guild.id, member.id)
+        total = await self.db.count_warnings(interaction.guild.id, member.id)
         
-        if not warnings:
+        if not total:
             return await interaction.response.send_message(f"{member.mention} has no warnings.", ephemeral=True)
         
-        embed = discord.Embed(
-            title=f"⚠️ Warnings for {member}",
-            color=discord.Color.yellow(),
-            timestamp=datetime.utcnow()
-        )
-        embed.set_thumbnail(url=member.display_avatar.url)
-        
-        for idx, warn in enumerate(warnings[:10], 1):
-            mod = interaction.guild.get_member(warn['moderator_id'])
-            mod_name = mod.mention if mod else f"ID: {warn['moderator_id']}"
-            timestamp = datetime.fromisoformat(warn['timestamp']).strftime("%Y-%m-%d %H:%M UTC")
-            
-            embed.add_field(
-                name=f"Warning #{warn['id']} - {timestamp}",
-                value=f"**Moderator:** {mod_name}\n**Reason:** {warn['reason']}",
-                inline=False
+        def render(page: List[Dict], page_number: int, page_count: int) -> discord.Embed:
+            embed = discord.Embed(
+                title=f"⚠️ Warnings for {member}",
+                color=discord.Color.yellow(),
+                timestamp=datetime.utcnow()
             )
+            embed.set_thumbnail(url=member.display_avatar.url)
+            
+            for warn in page:
+                mod = interaction.guild.get_member(warn['moderator_id'])
+                mod_name = mod.mention if mod else f"ID: {warn['moderator_id']}"
+                
+                embed.add_field(
+                    name=f"Warning #{warn['id']} - {format_timestamp(warn['timestamp'])}",
+                    value=f"**Moderator:** {mod_name}\n**Reason:** {warn['reason']}",
+                    inline=False
+                )
+            
+            embed.set_footer(text=f"Page {page_number} of {page_count} • {total} warning(s)")
+            return embed
         
-        if len(warnings) > 10:
-            embed.set_footer(text=f"Showing 10 of {len(warnings)} warnings")
-        
-        await interaction.response.send_message(embed=embed, ephemeral=True)
+        view = PaginatedEmbedView(interaction.user.id, self.db.iter_warnings(interaction.guild.id, member.id, PAGE_SIZE), total, render)
+        embed = await view.first_page()
+        await interaction.response.send_message(embed=embed, view=view, ephemeral=True)
     
     @app_commands.command(name="clearwarnings", description="Clear all warnings for a user")
     @app_commands.checks.has_permissions(moderate_members=True)
     async def clear_warnings(self, interaction: discord.Interaction, member: discord.Member):
-        count = await self.db.clear_warnings(interaction.guild.id, member.id)
-        await self.db.log_action(interaction.guild.id, "clear_warnings", member.id, interaction.user.id, f"Cleared {count} warnings")
+        count = await self.db.clear_warnings_and_log(interaction.guild.id, member.id, interaction.user.id)
         
         embed = discord.Embed(
             title="🗑️ Warnings Cleared",
@@ -134,7 +197,7 @@ class Moderation(commands.Cog):
             pass
         
         await member.kick(reason=f"{interaction.user}: {reason}")
-        await self.db.log_action(interaction.guild.id, "kick", member.id, interaction.user.id, reason)
+        await self.db.queue_action(interaction.guild.id, "kick", member.id, interaction.user.id, reason)
         
         embed = discord.Embed(
             title="👢 User Kicked",
@@ -166,7 +229,7 @@ class Moderation(commands.Cog):
             pass
         
         await member.ban(reason=f"{interaction.user}: {reason}", delete_message_days=delete_messages)
-        await self.db.log_action(interaction.guild.id, "ban", member.id, interaction.user.id, reason)
+        await self.db.queue_action(interaction.guild.id, "ban", member.id, interaction.user.id, reason)
         
         embed = discord.Embed(
             title="🔨 User Banned",
@@ -187,7 +250,7 @@ class Moderation(commands.Cog):
             user_id = int(user_id)
             user = await self.bot.fetch_user(user_id)
             await interaction.guild.unban(user, reason=f"{interaction.user}: {reason}")
-            await self.db.log_action(interaction.guild.id, "unban", user.id, interaction.user.id, reason)
+            await self.db.queue_action(interaction.guild.id, "unban", user.id, interaction.user.id, reason)
             
             embed = discord.Embed(
                 title="✅ User Unbanned",
@@ -219,7 +282,7 @@ class Moderation(commands.Cog):
         
         try:
             await member.timeout(timeout_until, reason=f"{interaction.user}: {reason}")
-            await self.db.log_action(interaction.guild.id, "timeout", member.id, interaction.user.id, reason, duration)
+            await self.db.queue_action(interaction.guild.id, "timeout", member.id, interaction.user.id, reason, duration)
             
             # Calculate duration display
             if duration < 60:
@@ -276,7 +339,7 @@ class Moderation(commands.Cog):
         
         try:
             await member.timeout(None, reason=f"{interaction.user}: {reason}")
-            await self.db.log_action(interaction.guild.id, "untimeout", member.id, interaction.user.id, reason)
+            await self.db.queue_action(interaction.guild.id, "untimeout", member.id, interaction.user.id, reason)
             
             embed = discord.Embed(
                 title="🔊 Timeout Removed",
@@ -297,34 +360,36 @@ class Moderation(commands.Cog):
     @app_commands.command(name="history", description="View moderation history for a user")
     @app_commands.checks.has_permissions(moderate_members=True)
     async def history(self, interaction: discord.Interaction, member: discord.Member):
-        history = await self.db.get_user_history(interaction.guild.id, member.id)
+        total = await self.db.count_user_history(interaction.guild.id, member.id)
         
-        if not history:
+        if not total:
             return await interaction.response.send_message(f"{member.mention} has no moderation history.", ephemeral=True)
         
-        embed = discord.Embed(
-            title=f"📜 Moderation History for {member}",
-            color=discord.Color.blue(),
-            timestamp=datetime.utcnow()
-        )
-        embed.set_thumbnail(url=member.display_avatar.url)
-        
-        for idx, action in enumerate(history[:10], 1):
-            mod = interaction.guild.get_member(action['moderator_id'])
-            mod_name = mod.mention if mod else f"ID: {action['moderator_id']}"
-            timestamp = datetime.fromisoformat(action['timestamp']).strftime("%Y-%m-%d %H:%M UTC")
-            
-            duration = f" ({action['duration']} min)" if action['duration'] else ""
-            embed.add_field(
-                name=f"{action['action_type'].upper()}{duration} - {timestamp}",
-                value=f"**Moderator:** {mod_name}\n**Reason:** {action['reason'] or 'N/A'}",
-                inline=False
+        def render(page: List[Dict], page_number: int, page_count: int) -> discord.Embed:
+            embed = discord.Embed(
+                title=f"📜 Moderation History for {member}",
+                color=discord.Color.blue(),
+                timestamp=datetime.utcnow()
             )
+            embed.set_thumbnail(url=member.display_avatar.url)
+            
+            for action in page:
+                mod = interaction.guild.get_member(action['moderator_id'])
+                mod_name = mod.mention if mod else f"ID: {action['moderator_id']}"
+                
+                duration = f" ({action['duration']} min)" if action['duration'] else ""
+                embed.add_field(
+                    name=f"{action['action_type'].upper()}{duration} - {format_timestamp(action['timestamp'])}",
+                    value=f"**Moderator:** {mod_name}\n**Reason:** {action['reason'] or 'N/A'}",
+                    inline=False
+                )
+            
+            embed.set_footer(text=f"Page {page_number} of {page_count} • {total} action(s)")
+            return embed
         
-        if len(history) > 10:
-            embed.set_footer(text=f"Showing 10 of {len(history)} actions")
-        
-        await interaction.response.send_message(embed=embed, ephemeral=True)
+        view = PaginatedEmbedView(interaction.user.id, self.db.iter_user_history(interaction.guild.id, member.id, PAGE_SIZE), total, render)
+        embed = await view.first_page()
+        await interaction.response.send_message(embed=embed, view=view, ephemeral=True)
 
     @app_commands.command()
     async def deletepost(self, interaction: discord.Interaction, reason: str):
@@ -0,0 +1,157 @@
+import asyncio
+import discord
+from discord.ext import commands, tasks
+from datetime import datetime, timedelta, timezone
+from typing import Dict
+
+import logging
+
+log = logging.getLogger(__name__)
+
+SHOWCASE_CHANNEL_ID = 1440185755745124503
+UPVOTE_EMOJI = '🔥'
+RECONCILE_HISTORY_LIMIT = 500
+RECONCILE_CONCURRENCY = 5
+# Older showcases are fetched one request each, so only the newest ones within this window are checked
+RECONCILE_MAX_AGE = timedelta(days=90)
+RECONCILE_MAX_FETCHES = 200
+
+def count_upvotes(message: discord.Message) -> int:
+    """Count a message's upvote reactions, not counting the bot's own. A removed reaction counts as 0."""
+    for reaction in message.reactions:
+        if str(reaction.emoji) == UPVOTE_EMOJI:
+            return reaction.count - (1 if reaction.me else 0)
+    return 0
+
+class Showcase(commands.Cog):
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+        self._pending: Dict[int, int] = {}
+        self._reconciled = False
+
+    async def cog_load(self):
+        self.apply_upvotes.start()
+        self.reconcile_upvotes.start()
+
+    async def cog_unload(self):
+        """Stop the background tasks and apply pending upvotes when cog is unloaded"""
+        self.apply_upvotes.cancel()
+        self.reconcile_upvotes.cancel()
+        try:
+            await self._apply_pending()
+        except Exception as e:
+            log.error(f"Error applying pending upvotes on unload: {e}")
+
+    def _track(self, payload: discord.RawReactionActionEvent, delta: int):
+        if payload.channel_id != SHOWCASE_CHANNEL_ID or str(payload.emoji) != UPVOTE_EMOJI:
+            return
+        if self.bot.user is not None and payload.user_id == self.bot.user.id:
+            return
+
+        self._pending[payload.message_id] = self._pending.get(payload.message_id, 0) + delta
+
+    @commands.Cog.listener()
+    async def on_raw_reaction_add(self, payload: discord.RawReactionActionEvent):
+        self._track(payload, 1)
+
+    @commands.Cog.listener()
+    async def on_raw_reaction_remove(self, payload: discord.RawReactionActionEvent):
+        self._track(payload, -1)
+
+    async def _apply_pending(self):
+        """Apply the net upvote change per showcase accumulated since the last run"""
+        for showcase_id, delta in list(self._pending.items()):
+            if delta:
+                await self.bot.database.add_upvotes(showcase_id, delta)
+
+            remaining = self._pending.get(showcase_id, 0) - delta
+            if remaining:
+                self._pending[showcase_id] = remaining
+            else:
+                self._pending.pop(showcase_id, None)
+
+    @tasks.loop(seconds=5)
+    async def apply_upvotes(self):
+        """Background task to apply debounced upvote changes"""
+        if not self._reconciled:
+            return
+
+        try:
+            await self._apply_pending()
+        except Exception as e:
+            log.error(f"Error applying upvotes: {e}")
+
+    @apply_upvotes.before_loop
+    async def before_apply_upvotes(self):
+        """Wait for bot to be ready before applying upvotes"""
+        await self.bot.wait_until_ready()
+
+    @tasks.loop(count=1)
+    async def reconcile_upvotes(self):
+        """One-off task that resets stored upvote counts to the actual reaction counts"""
+        channel = self.bot.get_channel(SHOWCASE_CHANNEL_ID)
+        if channel is None:
+            log.warning(f"Showcase channel {SHOWCASE_CHANNEL_ID} not found, skipping upvote reconciliation")
+            self._reconciled = True
+            return
+
+        db = self.bot.database
+        corrected = 0
+        try:
+            # Recent history already carries reaction counts, so only older showcases need a fetch each.
+            # Pages are fetched as the walk goes, so each message's pending delta is read when it comes up.
+            seen = set()
+            async for message in channel.history(limit=RECONCILE_HISTORY_LIMIT):
+                seen.add(message.id)
+                corrected += await self._reconcile(message.id, count_upvotes(message), self._pending.get(message.id, 0))
+
+            semaphore = asyncio.Semaphore(RECONCILE_CONCURRENCY)
+
+            async def reconcile_one(showcase_id: int) -> int:
+                async with semaphore:
+                    fetched = self._pending.get(showcase_id, 0)
+                    try:
+                        message = await channel.fetch_message(showcase_id)
+                    except discord.NotFound:
+                        return 0
+                    return await self._reconcile(showcase_id, count_upvotes(message), fetched)
+
+            oldest = discord.utils.time_snowflake(datetime.now(timezone.utc) - RECONCILE_MAX_AGE)
+            older = sorted((showcase_id for showcase_id in db.showcase_ids() if showcase_id not in seen and showcase_id >= oldest), reverse=True)
+            if len(older) > RECONCILE_MAX_FETCHES:
+                log.info(f"Only reconciling the newest {RECONCILE_MAX_FETCHES} of {len(older)} older showcase(s)")
+                older = older[:RECONCILE_MAX_FETCHES]
+            results = await asyncio.gather(*(reconcile_one(showcase_id) for showcase_id in older), return_exceptions=True)
+            for result in results:
+                if isinstance(result, Exception):
+                    log.error(f"Error reconciling showcase upvotes: {result}")
+                else:
+                    corrected += result
+        except Exception as e:
+            log.error(f"Error reconciling showcase upvotes: {e}")
+        finally:
+            self._reconciled = True
+
+        log.info(f"Upvote reconciliation corrected {corrected} showcase count(s)")
+
+    async def _reconcile(self, showcase_id: int, count: int, fetched: int) -> int:
+        """Store a fetched upvote count. fetched is the pending delta from before the fetch, which the count
+        already includes; reactions that arrived while the fetch was in flight stay pending."""
+        remaining = self._pending.get(showcase_id, 0) - fetched
+        if remaining:
+            self._pending[showcase_id] = remaining
+        else:
+            self._pending.pop(showcase_id, None)
+        if await self.bot.database.get_upvotes(showcase_id) == count:
+            return 0
+
+        await self.bot.database.set_upvotes(showcase_id, count)
+        return 1
+
+    @reconcile_upvotes.before_loop
+    async def before_reconcile_upvotes(self):
+        """Wait for bot to be ready before reconciling upvotes"""
+        await self.bot.wait_until_ready()
+
+async def setup(bot):
+    await bot.add_cog(Showcase(bot))
@@ -1,11 +1,16 @@
 import asyncio
 import discord
+from discord import app_commands
 from discord.ext import commands, tasks
 from database import Database
-from datetime import datetime
+from datetime import datetime, timedelta
 
 import logging
 
+from message_pipeline import MessageContext, PRIORITY_STATISTICS
+from metrics import count_member_statuses
+from cogs.diagnostics import STAFF_ROLE_ID
+
 log = logging.getLogger(__name__)
 
 class StatisticsCog(commands.Cog):
@@ -13,10 +18,27 @@ class StatisticsCog(commands.Cog):
         self.bot = bot
         self.db = bot.database
         self.collect_stats.start()
+        self.flush_activity.start()
+        self.rollup_stats.start()
     
-    def cog_unload(self):
-        """Stop the background task when cog is unloaded"""
+    async def cog_load(self):
+        self.bot.message_pipeline.register(
+            "statistics",
+            self.handle_message,
+            prefilter=lambda ctx: ctx.guild_id is not None,
+            priority=PRIORITY_STATISTICS
+        )
+
+    async def cog_unload(self):
+        """Stop the background tasks and flush buffered activity when cog is unloaded"""
+        self.bot.message_pipeline.unregister("statistics")
         self.collect_stats.cancel()
+        self.flush_activity.cancel()
+        self.rollup_stats.cancel()
+        try:
+            await self.db.flush_user_activity()
+        except Exception as e:
+            log.error(f"Error flushing user activity: {e}")
     
     @tasks.loop(minutes=5) 
     async def collect_stats(self):
@@ -32,26 +54,39 @@ class StatisticsCog(commands.Cog):
         """Wait for bot to be ready before starting stats collection"""
         await self.bot.wait_until_ready()
     
+    @tasks.loop(seconds=30)
+    async def flush_activity(self):
+        """Background task to write buffered user activity to the database"""
+        try:
+            await self.db.flush_user_activity()
+        except Exception as e:
+            log.error(f"Error flushing user activity: {e}")
+
+    @flush_activity.before_loop
+    async def before_flush_activity(self):
+        """Wait for bot to be ready before flushing user activity"""
+        await self.bot.wait_until_ready()
+
+    @tasks.loop(hours=1)
+    async def rollup_stats(self):
+        """Background task to downsample raw statistics into hourly and daily rollups"""
+        try:
+            rolled_up = await self.db.rollup_server_stats()
+            deleted = await self.db.cleanup_old_stats()
+            log.info(f"Rolled up server stats into {rolled_up['hourly']} hourly and {rolled_up['daily']} daily bucket(s), removed {deleted} raw row(s)")
+        except Exception as e:
+            log.error(f"Error rolling up server stats: {e}")
+
+    @rollup_stats.before_loop
+    async def before_rollup_stats(self):
+        """Wait for bot to be ready before rolling up statistics"""
+        await self.bot.wait_until_ready()
+
     async def _collect_guild_stats(self, guild):
         """Collect statistics for a single guild"""
         try:
-            online = 0
-            idle = 0
-            dnd = 0
-            offline = 0
-            
-            for member in guild.members:
-                if member.bot:
-                    continue
-                    
-                if member.status == discord.Status.online:
-                    online += 1
-                elif member.status == discord.Status.idle:
-                    idle += 1
-                elif member.status == discord.Status.dnd:
-                    dnd += 1
-                else:  # offline
-                    offline += 1
+            counts = count_member_statuses(guild)
+            online, idle, dnd, offline = counts['online'], counts['idle'], counts['dnd'], counts['offline']
             
             total_members = guild.member_count
             await self.db.log_server_stats(
@@ -69,14 +104,33 @@ class StatisticsCog(commands.Cog):
         except Exception as e:
             log.error(f"Error collecting stats for guild {guild.name} ({guild.id}): {e}")
 
-    @commands.Cog.listener()
-    async def on_message(self, message):
+    async def handle_message(self, ctx: MessageContext):
         """Track user activity when they send messages"""
-        if not message.author.bot and message.guild:
-            try:
-                await self.db.update_user_activity(message.guild.id, message.author.id)
-            except Exception as e:
-                log.error(f"Error updating user activity: {e}")
+        try:
+            if self.db.buffer_user_activity(ctx.guild_id, ctx.author_id):
+                await self.db.flush_user_activity()
+        except Exception as e:
+            log.error(f"Error updating user activity: {e}")
+
+    @app_commands.command(name="server-stats", description="Show member statistics over the past days (staff only)")
+    @app_commands.describe(days="How many days to look back")
+    @app_commands.checks.has_role(STAFF_ROLE_ID)
+    async def server_stats(self, interaction: discord.Interaction, days: app_commands.Range[int, 1, 365] = 7):
+        start = datetime.utcnow() - timedelta(days=days)
+        resolution, rows = await self.db.get_server_stats_range(interaction.guild.id, start)
+        if not rows:
+            return await interaction.response.send_message("No statistics have been recorded for this window yet.", ephemeral=True)
+
+        embed = discord.Embed(title=f"📊 Server Statistics (last {days} day(s))", color=discord.Color.blue())
+        samples = sum(row['samples'] for row in rows)
+        for column, name in (('total_members', 'Members'), ('online_members', 'Online'), ('idle_members', 'Idle'), ('dnd_members', 'DND')):
+            low = min(row[f"{column}_min"] for row in rows)
+            high = max(row[f"{column}_max"] for row in rows)
+            average = sum(row[f"{column}_avg"] * row['samples'] for row in rows) / samples
+            embed.add_field(name=name, value=f"min {low}, avg {average:.0f}, max {high}", inline=True)
+        embed.set_footer(text=f"{len(rows)} {resolution} point(s) from {samples} sample(s)")
+
+        await interaction.response.send_message(embed=embed, ephemeral=True)
 
 async def setup(bot):
     await bot.add_cog(StatisticsCog(bot))
\ No newline at end of file
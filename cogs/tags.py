@@ -1,6 +1,8 @@
 import discord
 from discord.ext import commands
 
+from message_pipeline import MessageContext, PRIORITY_TAGS
+
 TAGS = {
     "languages": {
         "title": None,
@@ -103,12 +105,22 @@ class Tags(commands.Cog):
                 else:
                     await ctx_or_interaction.send(content=content or None, embed=embed)
 
-    @commands.Cog.listener()
-    async def on_message(self, message):
+    async def cog_load(self):
+        self.bot.message_pipeline.register("tags", self.handle_message, prefilter=self.maybe_prefixed, priority=PRIORITY_TAGS)
+
+    async def cog_unload(self):
+        self.bot.message_pipeline.unregister("tags")
+
+    def maybe_prefixed(self, ctx: MessageContext) -> bool:
+        """Cheaply rule out messages that cannot start with a static command prefix"""
+        prefix = self.bot.command_prefix
+        if isinstance(prefix, str):
+            return ctx.content.startswith(prefix)
+        return True
+
+    async def handle_message(self, ctx: MessageContext):
         """Listen for tag commands in messages"""
-        if message.author.bot:
-            return
-        
+        message = ctx.message
         prefixes = await self.bot.get_prefix(message)
         if isinstance(prefixes, str):
             prefixes = [prefixes]
@@ -1,5 +1,5 @@
 import discord
-from discord.ext import commands
+from discord.ext import commands, tasks
 from discord import app_commands
 import asyncio
 import json
@@ -29,8 +29,7 @@ class TicketView(discord.ui.View):
         cog = interaction.client.get_cog('Tickets')
         db = cog.bot.database
         
-        existing_tickets = await db.get_user_tickets(guild.id, user.id, 1)
-        if existing_tickets and any(ticket['status'] == 'open' for ticket in existing_tickets):
+        if await db.get_open_ticket(guild.id, user.id):
             await interaction.response.send_message("You already have an open ticket!", ephemeral=True)
             return
 
@@ -195,6 +194,24 @@ class Tickets(commands.Cog):
         self.bot.add_view(TicketView())
         self.bot.add_view(TicketControlView())
         log.info("Ticket views added!")
+        self.reconcile_stats.start()
+
+    async def cog_unload(self):
+        """Stop the background task when cog is unloaded"""
+        self.reconcile_stats.cancel()
+
+    @tasks.loop(minutes=30)
+    async def reconcile_stats(self):
+        """Background task to correct drift in the cached ticket statistics"""
+        try:
+            await self.bot.database.reconcile_ticket_stats()
+        except Exception as e:
+            log.error(f"Error reconciling ticket stats: {e}")
+
+    @reconcile_stats.before_loop
+    async def before_reconcile_stats(self):
+        """Wait for bot to be ready before reconciling ticket stats"""
+        await self.bot.wait_until_ready()
 
     @commands.Cog.listener()
     async def on_ready(self):
@@ -225,7 +242,7 @@ class Tickets(commands.Cog):
             await interaction.response.send_message("This command can only be used in ticket channels!", ephemeral=True)
             return
 
-        ticket_info = await self.bot.db.get_ticket_by_channel(interaction.channel.id)
+        ticket_info = await self.bot.database.get_ticket_by_channel(interaction.channel.id)
         if not ticket_info:
             await interaction.response.send_message("Ticket not found in database!", ephemeral=True)
             return
@@ -238,7 +255,7 @@ class Tickets(commands.Cog):
             return
 
         await interaction.channel.set_permissions(user, read_messages=True, send_messages=True)
-        await self.bot.db.add_ticket_participant(ticket_info['id'], user.id, interaction.user.id)
+        await self.bot.database.queue_ticket_participant(ticket_info['id'], user.id, interaction.user.id)
         
         await interaction.response.send_message(f"{user.mention} has been added to this ticket.")
 
@@ -249,7 +266,7 @@ class Tickets(commands.Cog):
             await interaction.response.send_message("This command can only be used in ticket channels!", ephemeral=True)
             return
 
-        ticket_info = await self.bot.db.get_ticket_by_channel(interaction.channel.id)
+        ticket_info = await self.bot.database.get_ticket_by_channel(interaction.channel.id)
         if not ticket_info:
             await interaction.response.send_message("Ticket not found in database!", ephemeral=True)
             return
@@ -266,7 +283,7 @@ class Tickets(commands.Cog):
             return
 
         await interaction.channel.set_permissions(user, overwrite=None)
-        await self.bot.db.remove_ticket_participant(ticket_info['id'], user.id)
+        await self.bot.database.remove_ticket_participant(ticket_info['id'], user.id)
         
         await interaction.response.send_message(f"{user.mention} has been removed from this ticket.")
 
@@ -276,7 +293,7 @@ class Tickets(commands.Cog):
             await interaction.response.send_message("This command can only be used in ticket channels!", ephemeral=True)
             return
 
-        ticket_info = await self.bot.db.get_ticket_by_channel(interaction.channel.id)
+        ticket_info = await self.bot.database.get_ticket_by_channel(interaction.channel.id)
         if not ticket_info:
             await interaction.response.send_message("Ticket not found in database!", ephemeral=True)
             return
@@ -301,7 +318,7 @@ class Tickets(commands.Cog):
             await interaction.response.send_message("This command can only be used in ticket channels!", ephemeral=True)
             return
 
-        ticket_info = await self.bot.db.get_ticket_by_channel(interaction.channel.id)
+        ticket_info = await self.bot.database.get_ticket_by_channel(interaction.channel.id)
         if not ticket_info:
             await interaction.response.send_message("Ticket not found in database!", ephemeral=True)
             return
@@ -315,7 +332,7 @@ class Tickets(commands.Cog):
         embed.add_field(name="Ticket ID", value=f"`{ticket_info['id']}`", inline=True)
         embed.add_field(name="Ticket Owner", value=ticket_owner.mention if ticket_owner else f"Unknown (`{ticket_info['username']}`)", inline=True)
         embed.add_field(name="Channel", value=interaction.channel.mention, inline=True)
-        embed.add_field(name="Created", value=discord.utils.format_dt(datetime.fromisoformat(ticket_info['created_at'])), inline=True)
+        embed.add_field(name="Created", value=discord.utils.format_dt(ticket_info['created_at']), inline=True)
         embed.add_field(name="Status", value=ticket_info['status'].title(), inline=True)
         
         message_count = 0
@@ -332,7 +349,7 @@ class Tickets(commands.Cog):
             await interaction.response.send_message("You don't have permission to use this command!", ephemeral=True)
             return
 
-        stats = await self.bot.db.get_ticket_stats(interaction.guild.id)
+        stats = await self.bot.database.get_ticket_stats(interaction.guild.id)
         
         embed = discord.Embed(
             title="🎫 Ticket Statistics",
@@ -1,10 +1,13 @@
 import discord
 from discord import app_commands
 from discord.ext import commands
-import re
 
 from better_profanity import profanity
 
+from message_pipeline import MessageContext, PRIORITY_LINK_EMBEDS
+
+CROWDIN_CHANNEL_ID = 1440984193181028394
+
 class Utils(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
@@ -271,12 +274,21 @@ class Utils(commands.Cog):
 
         await interaction.response.send_message(embed=embed, ephemeral=True)
 
-    @commands.Cog.listener()
-    async def on_message(self, message: discord.Message):
-        if message.author.bot:
-            return
-        
-        if message.channel.id == 1440984193181028394:
+    async def cog_load(self):
+        self.bot.message_pipeline.register(
+            "utils",
+            self.handle_message,
+            prefilter=lambda ctx: bool(ctx.scan.message_links or ctx.scan.twitter_paths) or ctx.channel_id == CROWDIN_CHANNEL_ID,
+            priority=PRIORITY_LINK_EMBEDS,
+            concurrent=True
+        )
+
+    async def cog_unload(self):
+        self.bot.message_pipeline.unregister("utils")
+
+    async def handle_message(self, ctx: MessageContext):
+        message = ctx.message
+        if message.channel.id == CROWDIN_CHANNEL_ID:
             if len(message.embeds) < 1:
                 return
             
@@ -285,12 +297,7 @@ class Utils(commands.Cog):
                 await message.delete()
                 return
 
-        discord_link_pattern = r'https://discord\.com/channels/(\d+)/(\d+)/(\d+)'
-        matches = re.findall(discord_link_pattern, message.content)
-
-        for match in matches:
-            guild_id, channel_id, message_id = map(int, match)
-
+        for guild_id, channel_id, message_id in ctx.scan.message_links:
             if guild_id != 1440173445039132724:
                 continue
 
@@ -331,27 +338,7 @@ class Utils(commands.Cog):
             except (discord.NotFound, discord.Forbidden, discord.HTTPException):
                 continue
 
-        twitter_patterns = [
-            r'https://(www\.)?twitter\.com/\S+',
-            r'https://(www\.)?x\.com/\S+',
-            r'https://vxtwitter\.com/\S+',
-            r'https://fxtwitter\.com/\S+',
-            r'https://nitter\.net/\S+',
-        ]
-        
-        twitter_links = []
-        content = message.content
-        for pattern in twitter_patterns:
-            matches = re.findall(pattern, content)
-            for match in matches:
-                if 'twitter.com' in match or 'x.com' in match:
-                    path = re.search(r'(?:twitter|x)\.com(/\S+)', match)
-                    if path:
-                        xcancel_link = f"https://xcancel.com{path.group(1)}"
-                        twitter_links.append(xcancel_link)
-                else:
-                    xcancel_link = re.sub(r'https://[^/]+', 'https://xcancel.com', match)
-                    twitter_links.append(xcancel_link)
+        twitter_links = [f"https://xcancel.com{path}" for path in ctx.scan.twitter_paths]
         
         if twitter_links:
             links_text = '\n'.join([f"<{link}>" for link in twitter_links])
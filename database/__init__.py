@@ -1,4 +1,5 @@
+from .backends import Backend, MySQLBackend, SQLiteBackend, create_backend
 from .database import Database
-from .migration import Migration, MigrationManager
+from .migration import Migration, MigrationManager, OnlineMigration
 
-__all__ = ['Database', 'Migration', 'MigrationManager']
\ No newline at end of file
+__all__ = ['Backend', 'MySQLBackend', 'SQLiteBackend', 'create_backend', 'Database', 'Migration', 'MigrationManager', 'OnlineMigration']
\ No newline at end of file
@@ -0,0 +1,46 @@
+import argparse
+import asyncio
+import logging
+
+from dotenv import load_dotenv
+
+from . import Database, create_backend
+
+log = logging.getLogger("database")
+
+async def run(plan_only: bool):
+    database = Database(create_backend())
+    await database.backend.connect()
+    try:
+        manager = database.migration_manager
+        if plan_only:
+            async with database.acquire() as conn:
+                async with conn.cursor() as cursor:
+                    applied = await manager.get_applied_migrations(cursor)
+            for migration_number in manager.check_checksums(applied)[0]:
+                print(f"warning: {manager.files[migration_number].filename} was edited after it was applied")
+
+            plan = manager.plan(applied)
+            if not plan:
+                print("No pending migrations.")
+            for migration in plan:
+                depends = f" (depends on {', '.join(map(str, migration.depends))})" if migration.depends else ""
+                print(f"{migration.name}: {migration.description}{depends}")
+            return
+
+        for migration in await manager.run_migrations():
+            print(f"{migration.name}: {manager.timings[migration.migration_number] * 1000:.1f}ms")
+    finally:
+        await database.backend.close()
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m database", description="Apply pending database migrations, including the online migrations the bot defers until after startup")
+    parser.add_argument("--plan", action="store_true", help="print the pending migrations in order without applying them")
+    args = parser.parse_args()
+
+    load_dotenv()
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(name)s: %(message)s")
+    asyncio.run(run(args.plan))
+
+if __name__ == "__main__":
+    main()
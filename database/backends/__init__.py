@@ -0,0 +1,27 @@
+import os
+
+from .base import Backend
+from .mysql import MySQLBackend
+from .sqlite import SQLiteBackend
+
+def create_backend() -> Backend:
+    """Create the storage backend selected by the DB_BACKEND env var"""
+    backend = os.getenv("DB_BACKEND", "mysql").lower()
+    if backend == "sqlite":
+        return SQLiteBackend(os.getenv("DB_PATH", "database.db"))
+    if backend != "mysql":
+        raise ValueError(f"Unknown DB_BACKEND {backend!r}, expected 'mysql' or 'sqlite'")
+
+    return MySQLBackend(
+        host=os.getenv("DB_HOST", "localhost"),
+        port=int(os.getenv("DB_PORT", 3306)),
+        user=os.getenv("DB_USER"),
+        password=os.getenv("DB_PASSWORD"),
+        database=os.getenv("DB_NAME"),
+        pool_minsize=int(os.getenv("DB_POOL_MIN_SIZE", 1)),
+        pool_maxsize=int(os.getenv("DB_POOL_MAX_SIZE", 10)),
+        pool_recycle=int(os.getenv("DB_POOL_RECYCLE", 3600)),
+        acquire_timeout=float(os.getenv("DB_POOL_ACQUIRE_TIMEOUT", 10))
+    )
+
+__all__ = ['Backend', 'MySQLBackend', 'SQLiteBackend', 'create_backend']
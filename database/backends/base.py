@@ -0,0 +1,32 @@
+from abc import ABC, abstractmethod
+from typing import AsyncContextManager, Dict, Any
+
+class Backend(ABC):
+    """Base class for database storage backends"""
+
+    dialect: str = ""
+
+    @abstractmethod
+    async def connect(self):
+        """Open the backend's connection(s). Calling it again once connected is a no-op."""
+        pass
+
+    @abstractmethod
+    def acquire(self) -> AsyncContextManager:
+        """Acquire a connection for the duration of an async with block"""
+        pass
+
+    @abstractmethod
+    async def close(self):
+        """Close the backend's connection(s)"""
+        pass
+
+    @property
+    @abstractmethod
+    def connected(self) -> bool:
+        """Whether connect() has been called and close() has not"""
+        pass
+
+    def stats(self) -> Dict[str, Any]:
+        """Get backend specific connection statistics"""
+        return {'dialect': self.dialect, 'connected': self.connected}
@@ -0,0 +1,83 @@
+import asyncio
+import aiomysql
+from contextlib import asynccontextmanager
+from typing import Optional, Dict, Any
+import logging
+from .base import Backend
+
+import warnings
+from pymysql import Warning as MySQLWarning
+
+log = logging.getLogger(__name__)
+warnings.filterwarnings("ignore", category=MySQLWarning)
+
+class MySQLBackend(Backend):
+    """MySQL backend backed by an aiomysql connection pool"""
+
+    dialect = "mysql"
+
+    def __init__(self, host: str = "localhost", port: int = 3306,
+                 user: str = "root", password: str = "", database: str = "moderation",
+                 pool_minsize: int = 1, pool_maxsize: int = 10,
+                 pool_recycle: int = 3600, acquire_timeout: float = 10.0):
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password = password
+        self.database = database
+
+        self.pool_minsize = pool_minsize
+        self.pool_maxsize = pool_maxsize
+        self.pool_recycle = pool_recycle
+        self.acquire_timeout = acquire_timeout
+        self.pool: Optional[aiomysql.Pool] = None
+
+    @property
+    def connected(self) -> bool:
+        return self.pool is not None
+
+    async def connect(self):
+        """Create the connection pool if it hasn't been created yet"""
+        if self.pool is not None:
+            return
+
+        self.pool = await aiomysql.create_pool(
+            host=self.host,
+            port=self.port,
+            user=self.user,
+            password=self.password,
+            db=self.database,
+            minsize=self.pool_minsize,
+            maxsize=self.pool_maxsize,
+            pool_recycle=self.pool_recycle,
+            autocommit=True
+        )
+        log.info(f"Created database pool ({self.pool_minsize}-{self.pool_maxsize} connections)")
+
+    @asynccontextmanager
+    async def acquire(self):
+        """Acquire a connection from the pool and release it when done"""
+        if self.pool is None:
+            raise RuntimeError("Database pool has not been created, call init_db() first")
+
+        conn = await asyncio.wait_for(self.pool.acquire(), timeout=self.acquire_timeout)
+        try:
+            yield conn
+        finally:
+            self.pool.release(conn)
+
+    async def close(self):
+        """Close the connection pool, waiting for acquired connections to be released"""
+        if self.pool is None:
+            return
+
+        self.pool.close()
+        await self.pool.wait_closed()
+        self.pool = None
+        log.info("Closed database pool")
+
+    def stats(self) -> Dict[str, Any]:
+        stats = super().stats()
+        if self.pool is not None:
+            stats.update(pool_size=self.pool.size, pool_free=self.pool.freesize, pool_maxsize=self.pool.maxsize)
+        return stats
@@ -0,0 +1,169 @@
+import asyncio
+import re
+import sqlite3
+import aiosqlite
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import Optional, List, Dict, Any
+import logging
+from .base import Backend
+
+log = logging.getLogger(__name__)
+
+# Store datetimes as ISO text and, with PARSE_DECLTYPES, read DATETIME columns back as datetimes like aiomysql does.
+# Aggregates such as MAX() carry no declared type, so datetime columns must be read as plain columns.
+sqlite3.register_adapter(datetime, lambda value: value.isoformat(" "))
+sqlite3.register_converter("DATETIME", lambda value: datetime.fromisoformat(value.decode()))
+
+_INSERT_IGNORE = re.compile(r"\bINSERT\s+IGNORE\b", re.IGNORECASE)
+_ON_DUPLICATE_KEY = re.compile(r"\bON\s+DUPLICATE\s+KEY\s+UPDATE\b", re.IGNORECASE)
+_VALUES_FUNCTION = re.compile(r"\bVALUES\((\w+)\)", re.IGNORECASE)
+_ENGINE = re.compile(r"\)\s*ENGINE\s*=\s*\w+", re.IGNORECASE)
+_AUTO_INCREMENT = re.compile(r"\bINT\s+AUTO_INCREMENT\s+PRIMARY\s+KEY\b", re.IGNORECASE)
+_CREATE_TABLE = re.compile(r"^\s*CREATE\s+TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?(\w+)", re.IGNORECASE)
+_INLINE_INDEX = re.compile(r",\s*(UNIQUE\s+)?(?:INDEX|KEY)\s+(\w+)\s*\(([^)]*)\)", re.IGNORECASE)
+
+def translate(query: str) -> List[str]:
+    """Translate a MySQL statement, as written in this package, into one or more SQLite statements"""
+    query = query.replace("%s", "?").replace("%%", "%")
+    query = _INSERT_IGNORE.sub("INSERT OR IGNORE", query)
+    query = _ON_DUPLICATE_KEY.sub("ON CONFLICT DO UPDATE SET", query)
+    query = _VALUES_FUNCTION.sub(r"excluded.\1", query)
+    query = _ENGINE.sub(")", query)
+    query = _AUTO_INCREMENT.sub("INTEGER PRIMARY KEY AUTOINCREMENT", query)
+
+    table = _CREATE_TABLE.match(query)
+    if not table:
+        return [query]
+
+    # SQLite has no inline INDEX clauses and index names are global, so emit prefixed CREATE INDEX statements
+    table_name = table.group(1)
+    statements = [_INLINE_INDEX.sub("", query)]
+    for unique, index_name, columns in _INLINE_INDEX.findall(query):
+        statements.append(
+            f"CREATE {'UNIQUE ' if unique else ''}INDEX IF NOT EXISTS {table_name}_{index_name} ON {table_name} ({columns})"
+        )
+    return statements
+
+class SQLiteCursor:
+    """aiomysql-compatible cursor that runs translated statements on an aiosqlite connection"""
+
+    def __init__(self, connection: aiosqlite.Connection, as_dict: bool = False):
+        self._connection = connection
+        self._as_dict = as_dict
+        self._cursor: Optional[aiosqlite.Cursor] = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    @property
+    def lastrowid(self) -> Optional[int]:
+        return self._cursor.lastrowid if self._cursor else None
+
+    @property
+    def rowcount(self) -> int:
+        return self._cursor.rowcount if self._cursor else -1
+
+    @property
+    def description(self):
+        return self._cursor.description if self._cursor else None
+
+    async def execute(self, query: str, args=None) -> int:
+        for index, statement in enumerate(translate(query)):
+            await self.close()
+            self._cursor = await self._connection.execute(statement, (args or ()) if index == 0 else ())
+        return self.rowcount
+
+    async def executemany(self, query: str, args) -> int:
+        await self.close()
+        self._cursor = await self._connection.executemany(translate(query)[0], args)
+        return self.rowcount
+
+    def _convert(self, row):
+        if row is None or not self._as_dict:
+            return row
+        return {column[0]: value for column, value in zip(self._cursor.description, row)}
+
+    async def fetchone(self):
+        return self._convert(await self._cursor.fetchone())
+
+    async def fetchall(self) -> list:
+        return [self._convert(row) for row in await self._cursor.fetchall()]
+
+    async def close(self):
+        if self._cursor is not None:
+            await self._cursor.close()
+            self._cursor = None
+
+class SQLiteConnection:
+    """Connection handed out by SQLiteBackend.acquire(), mirroring the parts of the aiomysql API this package uses"""
+
+    def __init__(self, connection: aiosqlite.Connection):
+        self._connection = connection
+
+    def cursor(self, cursor_class=None) -> SQLiteCursor:
+        """Create a cursor. Rows are returned as dicts when a cursor class such as aiomysql.DictCursor is passed."""
+        return SQLiteCursor(self._connection, as_dict=cursor_class is not None)
+
+    async def begin(self):
+        await self._connection.execute("BEGIN")
+
+    async def commit(self):
+        await self._connection.execute("COMMIT")
+
+    async def rollback(self):
+        await self._connection.execute("ROLLBACK")
+
+class SQLiteBackend(Backend):
+    """SQLite backend using a single WAL-mode aiosqlite connection"""
+
+    dialect = "sqlite"
+
+    def __init__(self, path: str = "database.db", busy_timeout: int = 5000):
+        self.path = path
+        self.busy_timeout = busy_timeout
+        self._connection: Optional[aiosqlite.Connection] = None
+        self._lock = asyncio.Lock()
+
+    @property
+    def connected(self) -> bool:
+        return self._connection is not None
+
+    async def connect(self):
+        """Open the database file in WAL mode if it isn't open yet"""
+        if self._connection is not None:
+            return
+
+        self._connection = await aiosqlite.connect(self.path, isolation_level=None, detect_types=sqlite3.PARSE_DECLTYPES)
+        await self._connection.execute("PRAGMA journal_mode=WAL")
+        await self._connection.execute("PRAGMA synchronous=NORMAL")
+        await self._connection.execute("PRAGMA foreign_keys=ON")
+        await self._connection.execute(f"PRAGMA busy_timeout={int(self.busy_timeout)}")
+        log.info(f"Opened SQLite database at {self.path}")
+
+    @asynccontextmanager
+    async def acquire(self):
+        """Acquire exclusive use of the connection. Acquisitions are not reentrant."""
+        if self._connection is None:
+            raise RuntimeError("SQLite database has not been opened, call init_db() first")
+
+        async with self._lock:
+            yield SQLiteConnection(self._connection)
+
+    async def close(self):
+        """Close the connection once no one is using it"""
+        if self._connection is None:
+            return
+
+        async with self._lock:
+            await self._connection.close()
+            self._connection = None
+        log.info("Closed SQLite database")
+
+    def stats(self) -> Dict[str, Any]:
+        stats = super().stats()
+        stats.update(path=self.path, in_use=self._lock.locked())
+        return stats
@@ -0,0 +1,98 @@
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Tuple
+
+MISSING = object()
+
+class TTLCache:
+    """In-memory cache whose entries expire a fixed number of seconds after being set"""
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: Dict[Hashable, Tuple[Any, float]] = {}
+
+    def get(self, key: Hashable, default: Any = MISSING) -> Any:
+        """Get a cached value, counting the lookup as a hit or a miss"""
+        entry = self._entries.get(key)
+        if entry is None or entry[1] <= time.monotonic():
+            self.misses += 1
+            return default
+
+        self.hits += 1
+        return entry[0]
+
+    def set(self, key: Hashable, value: Any):
+        """Store a value, resetting its expiry"""
+        self._entries[key] = (value, time.monotonic() + self.ttl)
+
+    def invalidate(self, key: Hashable):
+        """Drop a single entry so the next lookup reloads it"""
+        self._entries.pop(key, None)
+
+    def clear(self):
+        """Drop all entries"""
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Get hit/miss counters for the cache"""
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'size': len(self._entries),
+            'hit_ratio': self.hits / lookups if lookups else 0.0
+        }
+
+class LRUCache:
+    """Size-bounded in-memory cache that evicts the least recently used entry"""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable, default: Any = MISSING) -> Any:
+        """Get a cached value and mark it as recently used"""
+        try:
+            value = self._entries[key]
+        except KeyError:
+            self.misses += 1
+            return default
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any):
+        """Store a value, evicting the least recently used entries if the cache is full"""
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, key: Hashable):
+        """Drop a single entry so the next lookup reloads it"""
+        self._entries.pop(key, None)
+
+    def clear(self):
+        """Drop all entries"""
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Get hit/miss/eviction counters for the cache"""
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'size': len(self._entries),
+            'hit_ratio': self.hits / lookups if lookups else 0.0
+        }
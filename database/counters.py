@@ -0,0 +1,78 @@
+import heapq
+from typing import Dict, Iterable, List, Set, Tuple
+
+class UpvoteCounters:
+    """In-memory showcase upvote counts with dirty tracking for batched flushes
+    and a lazily pruned max-heap answering top-N queries"""
+
+    def __init__(self):
+        self._counts: Dict[int, int] = {}
+        self._dirty: Set[int] = set()
+        # Entries are (-count, showcase_id); an entry is stale once the showcase's count has moved on
+        self._heap: List[Tuple[int, int]] = []
+
+    def __len__(self) -> int:
+        return len(self._counts)
+
+    def load(self, rows: Iterable[Tuple[int, int]]):
+        """Replace all counts with (showcase_id, count) rows read from the database"""
+        self._counts = dict(rows)
+        self._dirty.clear()
+        self._rebuild_heap()
+
+    def get(self, showcase_id: int) -> int:
+        return self._counts.get(showcase_id, 0)
+
+    def ids(self) -> List[int]:
+        return list(self._counts)
+
+    def set(self, showcase_id: int, count: int) -> int:
+        """Overwrite a showcase's count and mark it for the next flush"""
+        count = max(0, count)
+        if self._counts.get(showcase_id) != count:
+            self._counts[showcase_id] = count
+            self._dirty.add(showcase_id)
+            heapq.heappush(self._heap, (-count, showcase_id))
+            self._maybe_compact()
+        return count
+
+    def add(self, showcase_id: int, delta: int) -> int:
+        """Add a (possibly negative) delta to a showcase's count, never going below zero"""
+        return self.set(showcase_id, self.get(showcase_id) + delta)
+
+    def top(self, limit: int) -> List[Tuple[int, int]]:
+        """Get the (showcase_id, count) pairs with the highest counts, dropping stale heap entries on the way"""
+        found: List[Tuple[int, int]] = []
+        seen: Set[int] = set()
+        while self._heap and len(found) < limit:
+            negative_count, showcase_id = heapq.heappop(self._heap)
+            if showcase_id in seen or self._counts.get(showcase_id) != -negative_count:
+                continue
+            seen.add(showcase_id)
+            found.append((negative_count, showcase_id))
+
+        for entry in found:
+            heapq.heappush(self._heap, entry)
+        return [(showcase_id, -negative_count) for negative_count, showcase_id in found]
+
+    def take_dirty(self) -> Dict[int, int]:
+        """Get the current count of every showcase changed since the last flush and clear the dirty set"""
+        dirty = {showcase_id: self._counts[showcase_id] for showcase_id in self._dirty}
+        self._dirty.clear()
+        return dirty
+
+    def mark_dirty(self, showcase_ids: Iterable[int]):
+        """Mark showcases for the next flush again, e.g. after a failed write"""
+        self._dirty.update(showcase_ids)
+
+    def stats(self) -> Dict[str, int]:
+        return {'showcases': len(self._counts), 'dirty': len(self._dirty), 'heap_size': len(self._heap)}
+
+    def _maybe_compact(self):
+        """Rebuild the heap once stale entries outnumber live ones"""
+        if len(self._heap) > 2 * len(self._counts) + 64:
+            self._rebuild_heap()
+
+    def _rebuild_heap(self):
+        self._heap = [(-count, showcase_id) for showcase_id, count in self._counts.items()]
+        heapq.heapify(self._heap)
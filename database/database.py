@@ -1,451 +1,803 @@
 import aiomysql
+import asyncio
+import time
+from contextlib import asynccontextmanager
 from datetime import datetime, timedelta
-from typing import Optional, List, Dict
+from typing import Any, AsyncIterator, Optional, List, Dict, Set, Tuple
 import logging
+from .backends import Backend
+from .cache import MISSING, LRUCache, TTLCache
+from .counters import UpvoteCounters
+from .instrumentation import QueryMetrics, timed
 from .migration import MigrationManager
 from .migrations import discover_migrations
-
-import warnings
-from pymysql import Warning as MySQLWarning
+from .write_queue import WriteQueue
+from .rollups import HOUR, DAY, RESOLUTIONS, ROLLUP_CHUNK_DAILY, ROLLUP_CHUNK_HOURLY, ROLLUP_COLUMNS, floor_time, merge_rollups, pick_resolution, raw_as_rollup
 
 log = logging.getLogger(__name__)
-warnings.filterwarnings("ignore", category=MySQLWarning)
 
 class Database:
-    def __init__(self, host: str = "localhost", port: int = 3306,
-                 user: str = "root", password: str = "", database: str = "moderation"):
-        self.host = host
-        self.port = port
-        self.user = user
-        self.password = password
-        self.database = database
+    def __init__(self, backend: Backend, activity_flush_threshold: int = 500,
+                 config_cache_ttl: float = 300.0, follower_cache_size: int = 5000,
+                 slow_query_threshold: float = 0.25, write_queue_size: int = 1000,
+                 write_queue_workers: int = 2, upvote_flush_interval: float = 10.0,
+                 activity_buffer_limit: int = 50000, activity_retry_interval: float = 30.0):
+        self.backend = backend
+        self.query_metrics = QueryMetrics(slow_query_threshold)
+
+        self.activity_flush_threshold = activity_flush_threshold
+        self._activity_buffer: Dict[Tuple[int, int], datetime] = {}
+        self.activity_buffer_limit = activity_buffer_limit
+        self.activity_retry_interval = activity_retry_interval
+        self.activity_dropped = 0
+        self._activity_flush_failed_at: Optional[float] = None
+        self._config_cache = TTLCache(config_cache_ttl)
+        self._ticket_stats: Dict[int, Dict[str, int]] = {}
+        self._open_tickets: Dict[int, Dict] = {}
+        self._open_tickets_by_user: Dict[Tuple[int, int], int] = {}
+        self._thread_followers = LRUCache(follower_cache_size)
+        self.write_queue = WriteQueue(self, write_queue_size, write_queue_workers)
+        self.upvote_flush_interval = upvote_flush_interval
+        self._upvotes = UpvoteCounters()
+        self._upvote_flush_task: Optional[asyncio.Task] = None
+        self.ready = False
+        self.startup_timings: Dict[str, float] = {}
         
         self.migration_manager = MigrationManager(self)
         self._register_migrations()
     
     def _register_migrations(self):
-        """Register all available migrations"""
-        migrations = discover_migrations()
-        
-        for migration in migrations:
-            self.migration_manager.register_migration(migration)
-    
-    async def get_connection(self):
-        return await aiomysql.connect(
-            host=self.host,
-            port=self.port,
-            user=self.user,
-            password=self.password,
-            db=self.database,
-            autocommit=True
-        )
-    
-    async def init_db(self):
-        """Initialize database by running all migrations"""
-        await self.migration_manager.run_migrations()
-
-    async def run_migrations(self):
-        migrations = (
-            self.migration_001_upvotes_by_count,
-        )
+        """Register all available migration files"""
+        for migration_file in discover_migrations():
+            self.migration_manager.register_file(migration_file)
 
-        for migration in migrations:
-            name = migration.__name__
+    def acquire(self):
+        """Acquire a connection from the storage backend for an async with block"""
+        return self.backend.acquire()
 
+    @asynccontextmanager
+    async def transaction(self):
+        """Run several statements on one connection and commit them together, rolling back on error"""
+        async with self.acquire() as conn:
+            await conn.begin()
             try:
-                was_applied = await migration()
-                if was_applied:
-                    log.info(f"Applied migration: {name}")
-            except Exception:
-                log.error(f"Tried to apply migration {name} but failed. The migration can be safely re-run after the issue is fixed.")
+                async with conn.cursor() as cursor:
+                    yield cursor
+            except BaseException:
+                await conn.rollback()
                 raise
+            await conn.commit()
+
+    def query_stats(self) -> Dict[str, Dict]:
+        """Get latency and row count summaries for every Database method that has been called"""
+        return self.query_metrics.snapshot()
+
+    async def close(self):
+        """Stop the background writers, flush buffered writes and close the storage backend"""
+        # Stop the workers even if the backend dropped or never connected, so nothing outlives shutdown.
+        # Without a backend the queued rows cannot be written, so do not wait for them.
+        await self.write_queue.close(timeout=30.0 if self.backend.connected else 0)
+
+        if self._upvote_flush_task is not None:
+            self._upvote_flush_task.cancel()
+            self._upvote_flush_task = None
+
+        if not self.backend.connected:
+            self.ready = False
+            return
 
-    async def migration_001_upvotes_by_count(self) -> bool:
-        """Migrate upvotes table from a user-showcase schema to a showcase with count schema"""
-        conn = await self.get_connection()
         try:
-            async with conn.cursor() as cursor:
-                await cursor.execute("""
-                    SELECT column_name
-                    FROM information_schema.columns
-                    WHERE table_schema = %s AND table_name = 'upvotes'
-                    ORDER BY ORDINAL_POSITION
-                """, (self.database,))
-                columns = {row[0] for row in await cursor.fetchall()}
-                is_old_schema = columns == {'user_id', 'showcase_id'}
-
-                if not is_old_schema:
-                    return False
-
-                await cursor.execute("DROP TABLE IF EXISTS migration_001_upvotes_new")
-                await cursor.execute("""
-                    CREATE TABLE migration_001_upvotes_new (
-                        showcase_id BIGINT NOT NULL PRIMARY KEY,
-                        count INT NOT NULL DEFAULT 0
-                    ) ENGINE=InnoDB
-                """)
-                await cursor.execute("""
-                    INSERT INTO migration_001_upvotes_new (showcase_id, count)
-                    SELECT showcase_id, COUNT(*) AS count
-                    FROM upvotes
-                    GROUP BY showcase_id
-                """)
+            await self.flush_upvotes()
+        except Exception as e:
+            log.error(f"Failed to flush upvotes on shutdown: {e}")
 
-                await cursor.execute("""
-                    RENAME TABLE
-                        upvotes TO migration_001_upvotes_backup,
-                        migration_001_upvotes_new TO upvotes
-                """)
-
-                return True
-        finally:
-            conn.close()
+        try:
+            await self.flush_user_activity()
+        except Exception as e:
+            log.error(f"Failed to flush user activity on shutdown: {e}")
+
+        await self.backend.close()
+        self.ready = False
+    
+    async def init_db(self):
+        """Initialize database by connecting the backend, running all migrations and warming the caches.
+        Safe to call again once the database is ready."""
+        if self.ready:
+            return
+
+        async with self._phase('connect'):
+            await self.backend.connect()
+        async with self._phase('migrations'):
+            await self.migration_manager.run_migrations(include_online=False)
+        async with self._phase('warm_caches'):
+            await asyncio.gather(
+                self.load_mod_config(),
+                self.load_thread_followers(),
+                self.load_upvotes(),
+                self.load_open_tickets()
+            )
+
+        self.write_queue.start()
+        if self._upvote_flush_task is None:
+            self._upvote_flush_task = asyncio.create_task(self._flush_upvotes_periodically())
+        self.ready = True
+        log.info(f"Database ready in {sum(self.startup_timings.values()) * 1000:.0f}ms ({', '.join(f'{phase} {duration * 1000:.0f}ms' for phase, duration in self.startup_timings.items())})")
+
+    async def run_online_migrations(self) -> List:
+        """Apply the online migrations init_db left pending, returning the migrations that were applied"""
+        return await self.migration_manager.run_migrations()
+
+    @asynccontextmanager
+    async def _phase(self, name: str):
+        """Time one phase of init_db"""
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            log.error(f"Database startup failed during {name} after {(time.perf_counter() - start) * 1000:.0f}ms")
+            raise
+        self.startup_timings[name] = time.perf_counter() - start
     
     # Warning methods
+    @timed
     async def add_warning(self, guild_id: int, user_id: int, moderator_id: int, reason: str) -> int:
-        conn = await self.get_connection()
-        try:
+        async with self.acquire() as conn:
             async with conn.cursor() as cursor:
-                await cursor.execute(
-                    "INSERT INTO warnings (guild_id, user_id, moderator_id, reason, timestamp) VALUES (%s, %s, %s, %s, %s)",
-                    (guild_id, user_id, moderator_id, reason, datetime.utcnow())
-                )
-                return cursor.lastrowid
-        finally:
-            conn.close()
+                return await self._insert_warning(cursor, guild_id, user_id, moderator_id, reason)
+
+    @timed
+    async def record_warning(self, guild_id: int, user_id: int, moderator_id: int, reason: str) -> Tuple[int, int]:
+        """Add a warning and its mod action in one transaction. Returns (warning ID, total warnings)."""
+        async with self.transaction() as cursor:
+            warning_id = await self._insert_warning(cursor, guild_id, user_id, moderator_id, reason)
+            await self._insert_action(cursor, guild_id, "warn", user_id, moderator_id, reason)
+            await cursor.execute(
+                "SELECT COUNT(*) FROM warnings WHERE guild_id = %s AND user_id = %s",
+                (guild_id, user_id)
+            )
+            warning_count = (await cursor.fetchone())[0]
+        return warning_id, warning_count
+
+    async def _insert_warning(self, cursor, guild_id: int, user_id: int, moderator_id: int, reason: str) -> int:
+        await cursor.execute(
+            "INSERT INTO warnings (guild_id, user_id, moderator_id, reason, timestamp) VALUES (%s, %s, %s, %s, %s)",
+            (guild_id, user_id, moderator_id, reason, datetime.utcnow())
+        )
+        return cursor.lastrowid
     
+    @timed
     async def get_warnings(self, guild_id: int, user_id: int) -> List[Dict]:
-        conn = await self.get_connection()
-        try:
+        async with self.acquire() as conn:
             async with conn.cursor(aiomysql.DictCursor) as cursor:
                 await cursor.execute(
                     "SELECT * FROM warnings WHERE guild_id = %s AND user_id = %s ORDER BY timestamp DESC",
                     (guild_id, user_id)
                 )
                 return await cursor.fetchall()
-        finally:
-            conn.close()
     
+    @timed
+    async def count_warnings(self, guild_id: int, user_id: int) -> int:
+        """Count a user's warnings"""
+        async with self.acquire() as conn:
+            async with conn.cursor() as cursor:
+                await cursor.execute(
+                    "SELECT COUNT(*) FROM warnings WHERE guild_id = %s AND user_id = %s",
+                    (guild_id, user_id)
+                )
+                return (await cursor.fetchone())[0]
+
+    @timed
+    async def get_warnings_page(self, guild_id: int, user_id: int, limit: int = 10,
+                                before: Optional[Tuple[Any, int]] = None) -> List[Dict]:
+        """Get a page of a user's warnings, newest first, starting after the given (timestamp, id) key"""
+        return await self._fetch_keyset_page(
+            "warnings", "id, moderator_id, reason, timestamp", guild_id, user_id, limit, before
+        )
+
+    async def iter_warnings(self, guild_id: int, user_id: int, page_size: int = 10) -> AsyncIterator[List[Dict]]:
+        """Yield pages of a user's warnings, newest first, only querying a page when it is requested"""
+        async for page in self._iter_keyset_pages(self.get_warnings_page, guild_id, user_id, page_size):
+            yield page
+    
+    @timed
     async def remove_warning(self, warning_id: int) -> bool:
-        conn = await self.get_connection()
-        try:
+        async with self.acquire() as conn:
             async with conn.cursor() as cursor:
                 await cursor.execute("DELETE FROM warnings WHERE id = %s", (warning_id,))
                 return cursor.rowcount > 0
-        finally:
-            conn.close()
     
+    @timed
     async def clear_warnings(self, guild_id: int, user_id: int) -> int:
-        conn = await self.get_connection()
-        try:
+        async with self.acquire() as conn:
             async with conn.cursor() as cursor:
                 await cursor.execute(
                     "DELETE FROM warnings WHERE guild_id = %s AND user_id = %s",
                     (guild_id, user_id)
                 )
                 return cursor.rowcount
-        finally:
-            conn.close()
+
+    @timed
+    async def clear_warnings_and_log(self, guild_id: int, user_id: int, moderator_id: int) -> int:
+        """Clear a user's warnings and log the action in one transaction. Returns the number of warnings cleared."""
+        async with self.transaction() as cursor:
+            await cursor.execute(
+                "DELETE FROM warnings WHERE guild_id = %s AND user_id = %s",
+                (guild_id, user_id)
+            )
+            count = cursor.rowcount
+            await self._insert_action(cursor, guild_id, "clear_warnings", user_id, moderator_id, f"Cleared {count} warnings")
+        return count
     
     # Mod actions log
+    @timed
     async def log_action(self, guild_id: int, action_type: str, user_id: int, 
                         moderator_id: int, reason: str = None, duration: int = None):
-        conn = await self.get_connection()
-        try:
+        async with self.acquire() as conn:
             async with conn.cursor() as cursor:
-                await cursor.execute(
-                    "INSERT INTO mod_actions (guild_id, action_type, user_id, moderator_id, reason, duration, timestamp) VALUES (%s, %s, %s, %s, %s, %s, %s)",
-                    (guild_id, action_type, user_id, moderator_id, reason, duration, datetime.utcnow())
-                )
-        finally:
-            conn.close()
+                await self._insert_action(cursor, guild_id, action_type, user_id, moderator_id, reason, duration)
+
+    async def queue_action(self, guild_id: int, action_type: str, user_id: int,
+                           moderator_id: int, reason: str = None, duration: int = None):
+        """Queue a mod action to be written in the background, waiting only if the write queue is full"""
+        if not self.write_queue.running:
+            return await self.log_action(guild_id, action_type, user_id, moderator_id, reason, duration)
+
+        await self.write_queue.put(
+            "mod_actions",
+            "INSERT INTO mod_actions (guild_id, action_type, user_id, moderator_id, reason, duration, timestamp) VALUES",
+            (guild_id, action_type, user_id, moderator_id, reason, duration, datetime.utcnow())
+        )
+
+    async def _insert_action(self, cursor, guild_id: int, action_type: str, user_id: int,
+                             moderator_id: int, reason: str = None, duration: int = None):
+        await cursor.execute(
+            "INSERT INTO mod_actions (guild_id, action_type, user_id, moderator_id, reason, duration, timestamp) VALUES (%s, %s, %s, %s, %s, %s, %s)",
+            (guild_id, action_type, user_id, moderator_id, reason, duration, datetime.utcnow())
+        )
     
+    @timed
     async def get_user_history(self, guild_id: int, user_id: int) -> List[Dict]:
-        conn = await self.get_connection()
-        try:
+        async with self.acquire() as conn:
             async with conn.cursor(aiomysql.DictCursor) as cursor:
                 await cursor.execute(
                     "SELECT * FROM mod_actions WHERE guild_id = %s AND user_id = %s ORDER BY timestamp DESC LIMIT 50",
                     (guild_id, user_id)
                 )
                 return await cursor.fetchall()
-        finally:
-            conn.close()
+    
+    @timed
+    async def count_user_history(self, guild_id: int, user_id: int) -> int:
+        """Count the moderation actions taken against a user"""
+        async with self.acquire() as conn:
+            async with conn.cursor() as cursor:
+                await cursor.execute(
+                    "SELECT COUNT(*) FROM mod_actions WHERE guild_id = %s AND user_id = %s",
+                    (guild_id, user_id)
+                )
+                return (await cursor.fetchone())[0]
+
+    @timed
+    async def get_user_history_page(self, guild_id: int, user_id: int, limit: int = 10,
+                                    before: Optional[Tuple[Any, int]] = None) -> List[Dict]:
+        """Get a page of a user's moderation history, newest first, starting after the given (timestamp, id) key"""
+        return await self._fetch_keyset_page(
+            "mod_actions", "id, action_type, moderator_id, reason, duration, timestamp", guild_id, user_id, limit, before
+        )
+
+    async def iter_user_history(self, guild_id: int, user_id: int, page_size: int = 10) -> AsyncIterator[List[Dict]]:
+        """Yield pages of a user's moderation history, newest first, only querying a page when it is requested"""
+        async for page in self._iter_keyset_pages(self.get_user_history_page, guild_id, user_id, page_size):
+            yield page
+
+    async def _fetch_keyset_page(self, table: str, columns: str, guild_id: int, user_id: int,
+                                 limit: int, before: Optional[Tuple[Any, int]]) -> List[Dict]:
+        """Fetch rows of a per-user table ordered by (timestamp, id) descending, after an optional keyset position"""
+        query = f"SELECT {columns} FROM {table} WHERE guild_id = %s AND user_id = %s"
+        params: list = [guild_id, user_id]
+        if before is not None:
+            query += " AND (timestamp < %s OR (timestamp = %s AND id < %s))"
+            params.extend((before[0], before[0], before[1]))
+        query += " ORDER BY timestamp DESC, id DESC LIMIT %s"
+        params.append(limit)
+
+        async with self.acquire() as conn:
+            async with conn.cursor(aiomysql.DictCursor) as cursor:
+                await cursor.execute(query, params)
+                return list(await cursor.fetchall())
+
+    async def _iter_keyset_pages(self, fetch_page, guild_id: int, user_id: int, page_size: int) -> AsyncIterator[List[Dict]]:
+        """Drive a keyset page fetcher, remembering the last (timestamp, id) between pages"""
+        before = None
+        while True:
+            page = await fetch_page(guild_id, user_id, page_size, before)
+            if not page:
+                return
+            yield page
+            if len(page) < page_size:
+                return
+            before = (page[-1]['timestamp'], page[-1]['id'])
     
     # Config methods
+    @timed
     async def set_log_channel(self, guild_id: int, channel_id: int):
-        conn = await self.get_connection()
-        try:
+        async with self.acquire() as conn:
             async with conn.cursor() as cursor:
                 await cursor.execute(
                     "INSERT INTO mod_config (guild_id, log_channel_id) VALUES (%s, %s) ON DUPLICATE KEY UPDATE log_channel_id = VALUES(log_channel_id)",
                     (guild_id, channel_id)
                 )
-        finally:
-            conn.close()
+        self._config_cache.set(guild_id, channel_id)
     
+    @timed
     async def get_log_channel(self, guild_id: int) -> Optional[int]:
-        conn = await self.get_connection()
-        try:
+        """Get the log channel for a guild, served from the config cache when possible"""
+        channel_id = self._config_cache.get(guild_id)
+        if channel_id is not MISSING:
+            return channel_id
+
+        async with self.acquire() as conn:
             async with conn.cursor() as cursor:
                 await cursor.execute(
                     "SELECT log_channel_id FROM mod_config WHERE guild_id = %s",
                     (guild_id,)
                 )
                 row = await cursor.fetchone()
-                return row[0] if row else None
-        finally:
-            conn.close()
+                channel_id = row[0] if row else None
 
-    async def set_upvotes(self, showcase_id: int, count: int):
-        conn = await self.get_connection()
-        try:
+        self._config_cache.set(guild_id, channel_id)
+        return channel_id
+
+    @timed
+    async def load_mod_config(self):
+        """Load the whole mod_config table into the config cache"""
+        async with self.acquire() as conn:
             async with conn.cursor() as cursor:
-                await cursor.execute("""
-                    INSERT INTO upvotes (showcase_id, count) VALUES (%s, %s)
-                        ON DUPLICATE KEY UPDATE count = %s
-                """, (showcase_id, count, count))
-        finally:
-            conn.close()
+                await cursor.execute("SELECT guild_id, log_channel_id FROM mod_config")
+                rows = await cursor.fetchall()
 
-    async def get_upvotes(self, showcase_id: int) -> int:
-        conn = await self.get_connection()
-        try:
+        for guild_id, log_channel_id in rows:
+            self._config_cache.set(guild_id, log_channel_id)
+        log.info(f"Loaded mod config for {len(rows)} guild(s)")
+
+    def config_cache_stats(self) -> Dict:
+        """Get hit/miss counters for the mod config cache"""
+        return self._config_cache.stats()
+
+    # Upvote methods
+    @timed
+    async def load_upvotes(self):
+        """Load every showcase's upvote count into memory"""
+        async with self.acquire() as conn:
             async with conn.cursor() as cursor:
-                await cursor.execute(
-                    "SELECT count FROM upvotes WHERE showcase_id = %s",
-                    (showcase_id,)
-                )
-                row = await cursor.fetchone()
-                return row[0] if row else 0
-        finally:
-            conn.close()
+                await cursor.execute("SELECT showcase_id, count FROM upvotes")
+                rows = await cursor.fetchall()
+
+        self._upvotes.load(rows)
+        log.info(f"Loaded upvote counts for {len(rows)} showcase(s)")
+
+    @timed
+    async def set_upvotes(self, showcase_id: int, count: int):
+        """Set a showcase's upvote count in memory, to be written on the next flush"""
+        self._upvotes.set(showcase_id, count)
+
+    @timed
+    async def add_upvotes(self, showcase_id: int, delta: int = 1) -> int:
+        """Increment (or with a negative delta, decrement) a showcase's upvote count and return the new count"""
+        return self._upvotes.add(showcase_id, delta)
+
+    @timed
+    async def get_upvotes(self, showcase_id: int) -> int:
+        return self._upvotes.get(showcase_id)
+
+    @timed
+    async def get_top_showcases(self, limit: int = 5) -> List[Dict]:
+        """Get the showcases with the most upvotes from the in-memory leaderboard"""
+        return [
+            {'showcase_id': showcase_id, 'upvote_count': count}
+            for showcase_id, count in self._upvotes.top(limit)
+        ]
 
     async def get_top_5_showcases(self) -> List[Dict]:
-        conn = await self.get_connection()
+        return await self.get_top_showcases(5)
+
+    @timed
+    async def flush_upvotes(self) -> int:
+        """Write every changed upvote count in batched multi-row upserts"""
+        pending = self._upvotes.take_dirty()
+        if not pending:
+            return 0
+
+        rows = list(pending.items())
         try:
-            async with conn.cursor(aiomysql.DictCursor) as cursor:
-                await cursor.execute("""
-                    SELECT showcase_id, count AS upvote_count
-                    FROM upvotes
-                    ORDER BY count DESC
-                    LIMIT 5
-                """)
-                return await cursor.fetchall()
-        finally:
-            conn.close()
+            async with self.acquire() as conn:
+                async with conn.cursor() as cursor:
+                    for offset in range(0, len(rows), 500):
+                        chunk = rows[offset:offset + 500]
+                        await cursor.execute(
+                            f"INSERT INTO upvotes (showcase_id, count) VALUES {', '.join(['(%s, %s)'] * len(chunk))} "
+                            "ON DUPLICATE KEY UPDATE count = VALUES(count)",
+                            [value for row in chunk for value in row]
+                        )
+        except Exception:
+            self._upvotes.mark_dirty(pending)
+            raise
+        return len(rows)
+
+    async def _flush_upvotes_periodically(self):
+        while True:
+            await asyncio.sleep(self.upvote_flush_interval)
+            try:
+                await self.flush_upvotes()
+            except Exception as e:
+                log.error(f"Error flushing upvotes: {e}")
+
+    def showcase_ids(self) -> List[int]:
+        """Get the IDs of every showcase with a stored upvote count"""
+        return self._upvotes.ids()
+
+    def upvote_stats(self) -> Dict:
+        """Get the size of the in-memory upvote counters and leaderboard heap"""
+        return self._upvotes.stats()
     
     # Thread follower methods
+    @timed
+    async def load_thread_followers(self):
+        """Warm the in-memory follower index with the followers of the newest threads it can hold"""
+        async with self.acquire() as conn:
+            async with conn.cursor() as cursor:
+                # Thread IDs are snowflakes, so the highest are the newest threads. Load them oldest
+                # first so the newest threads end up most recently used in the LRU.
+                await cursor.execute("""
+                    SELECT f.thread_id, f.user_id FROM thread_followers f
+                    JOIN (
+                        SELECT DISTINCT thread_id FROM thread_followers ORDER BY thread_id DESC LIMIT %s
+                    ) AS recent ON recent.thread_id = f.thread_id
+                    ORDER BY f.thread_id
+                """, (self._thread_followers.maxsize,))
+                rows = await cursor.fetchall()
+
+        followers: Dict[int, Set[int]] = {}
+        for thread_id, user_id in rows:
+            followers.setdefault(thread_id, set()).add(user_id)
+
+        for thread_id, user_ids in followers.items():
+            self._thread_followers.set(thread_id, user_ids)
+        log.info(f"Loaded {len(rows)} follower(s) across {len(followers)} thread(s)")
+
+    async def _get_follower_set(self, thread_id: int) -> Set[int]:
+        """Get the cached follower set of a thread, loading it from the database if it was evicted"""
+        followers = self._thread_followers.get(thread_id)
+        if followers is MISSING:
+            async with self.acquire() as conn:
+                async with conn.cursor() as cursor:
+                    await cursor.execute(
+                        "SELECT user_id FROM thread_followers WHERE thread_id = %s",
+                        (thread_id,)
+                    )
+                    followers = {row[0] for row in await cursor.fetchall()}
+            self._thread_followers.set(thread_id, followers)
+        return followers
+
+    @timed
     async def add_thread_follower(self, thread_id: int, user_id: int) -> bool:
         """Add a user as a follower of a thread. Returns True if added, False if already following."""
-        conn = await self.get_connection()
-        try:
+        followers = await self._get_follower_set(thread_id)
+        if user_id in followers:
+            return False
+
+        async with self.acquire() as conn:
             async with conn.cursor() as cursor:
                 await cursor.execute(
                     "INSERT IGNORE INTO thread_followers (thread_id, user_id) VALUES (%s, %s)",
                     (thread_id, user_id)
                 )
-                return cursor.rowcount > 0
-        finally:
-            conn.close()
+                added = cursor.rowcount > 0
+
+        followers.add(user_id)
+        return added
     
+    @timed
     async def remove_thread_follower(self, thread_id: int, user_id: int) -> bool:
         """Remove a user as a follower of a thread. Returns True if removed, False if not following."""
-        conn = await self.get_connection()
-        try:
+        followers = await self._get_follower_set(thread_id)
+        if user_id not in followers:
+            return False
+
+        async with self.acquire() as conn:
             async with conn.cursor() as cursor:
                 await cursor.execute(
                     "DELETE FROM thread_followers WHERE thread_id = %s AND user_id = %s",
                     (thread_id, user_id)
                 )
-                return cursor.rowcount > 0
-        finally:
-            conn.close()
+                removed = cursor.rowcount > 0
+
+        followers.discard(user_id)
+        return removed
     
+    @timed
     async def get_thread_followers(self, thread_id: int) -> List[int]:
         """Get all followers of a thread."""
-        conn = await self.get_connection()
-        try:
-            async with conn.cursor() as cursor:
-                await cursor.execute(
-                    "SELECT user_id FROM thread_followers WHERE thread_id = %s",
-                    (thread_id,)
-                )
-                rows = await cursor.fetchall()
-                return [row[0] for row in rows]
-        finally:
-            conn.close()
+        return list(await self._get_follower_set(thread_id))
     
+    @timed
     async def is_following_thread(self, thread_id: int, user_id: int) -> bool:
         """Check if a user is following a thread."""
-        conn = await self.get_connection()
-        try:
-            async with conn.cursor() as cursor:
-                await cursor.execute(
-                    "SELECT 1 FROM thread_followers WHERE thread_id = %s AND user_id = %s",
-                    (thread_id, user_id)
-                )
-                row = await cursor.fetchone()
-                return row is not None
-        finally:
-            conn.close()
+        return user_id in await self._get_follower_set(thread_id)
+
+    def follower_cache_stats(self) -> Dict:
+        """Get hit/miss/eviction counters for the thread follower index"""
+        return self._thread_followers.stats()
     
     # Ticket methods
+    @timed
+    async def load_open_tickets(self):
+        """Load every open ticket into the in-memory registry"""
+        tickets = await self.get_open_tickets()
+        self._open_tickets.clear()
+        self._open_tickets_by_user.clear()
+        for ticket in tickets:
+            self._register_open_ticket(ticket)
+        log.info(f"Loaded {len(tickets)} open ticket(s)")
+
+    def _register_open_ticket(self, ticket: Dict):
+        self._open_tickets[ticket['channel_id']] = ticket
+        self._open_tickets_by_user[(ticket['guild_id'], ticket['user_id'])] = ticket['channel_id']
+
+    def _unregister_open_ticket(self, channel_id: int) -> Optional[Dict]:
+        ticket = self._open_tickets.pop(channel_id, None)
+        if ticket is not None:
+            key = (ticket['guild_id'], ticket['user_id'])
+            if self._open_tickets_by_user.get(key) == channel_id:
+                del self._open_tickets_by_user[key]
+        return ticket
+
+    @timed
     async def create_ticket(self, guild_id: int, channel_id: int, user_id: int, username: str) -> int:
         """Create a new ticket record and return the ticket ID"""
-        conn = await self.get_connection()
-        try:
+        created_at = datetime.utcnow()
+        async with self.acquire() as conn:
             async with conn.cursor() as cursor:
                 await cursor.execute(
                     "INSERT INTO tickets (guild_id, channel_id, user_id, username, created_at) VALUES (%s, %s, %s, %s, %s)",
-                    (guild_id, channel_id, user_id, username, datetime.utcnow())
+                    (guild_id, channel_id, user_id, username, created_at)
                 )
-                return cursor.lastrowid
-        finally:
-            conn.close()
+                ticket_id = cursor.lastrowid
 
+        self._register_open_ticket({
+            'id': ticket_id,
+            'guild_id': guild_id,
+            'channel_id': channel_id,
+            'user_id': user_id,
+            'username': username,
+            'created_at': created_at,
+            'closed_at': None,
+            'closed_by': None,
+            'status': 'open',
+            'transcript_url': None
+        })
+
+        stats = self._ticket_stats.get(guild_id)
+        if stats is not None:
+            stats['total'] += 1
+            stats['open'] += 1
+        return ticket_id
+
+    @timed
     async def close_ticket(self, channel_id: int, closed_by: int, transcript_url: str = None) -> bool:
         """Close a ticket by channel ID"""
-        conn = await self.get_connection()
-        try:
+        async with self.acquire() as conn:
             async with conn.cursor() as cursor:
                 await cursor.execute(
                     "UPDATE tickets SET closed_at = %s, closed_by = %s, status = 'closed', transcript_url = %s WHERE channel_id = %s",
                     (datetime.utcnow(), closed_by, transcript_url, channel_id)
                 )
-                return cursor.rowcount > 0
-        finally:
-            conn.close()
+                closed = cursor.rowcount > 0
+
+        ticket = self._unregister_open_ticket(channel_id)
+        if closed and ticket is not None:
+            stats = self._ticket_stats.get(ticket['guild_id'])
+            if stats is not None:
+                stats['open'] -= 1
+                stats['closed'] += 1
+        return closed
 
+    @timed
     async def get_ticket_by_channel(self, channel_id: int) -> Optional[Dict]:
-        """Get ticket info by channel ID"""
-        conn = await self.get_connection()
-        try:
+        """Get ticket info by channel ID, answering open tickets from the registry"""
+        ticket = self._open_tickets.get(channel_id)
+        if ticket is not None:
+            return dict(ticket)
+
+        async with self.acquire() as conn:
             async with conn.cursor(aiomysql.DictCursor) as cursor:
                 await cursor.execute(
                     "SELECT * FROM tickets WHERE channel_id = %s",
                     (channel_id,)
                 )
                 return await cursor.fetchone()
-        finally:
-            conn.close()
 
-    async def get_open_tickets(self, guild_id: int) -> List[Dict]:
-        """Get all open tickets for a guild"""
-        conn = await self.get_connection()
-        try:
+    @timed
+    async def get_open_ticket(self, guild_id: int, user_id: int) -> Optional[Dict]:
+        """Get a user's open ticket in a guild from the registry"""
+        channel_id = self._open_tickets_by_user.get((guild_id, user_id))
+        if channel_id is None:
+            return None
+        return dict(self._open_tickets[channel_id])
+
+    @timed
+    async def get_open_tickets(self, guild_id: Optional[int] = None) -> List[Dict]:
+        """Get all open tickets for a guild, or for every guild if none is given"""
+        query = "SELECT * FROM tickets WHERE status = 'open'"
+        params = ()
+        if guild_id is not None:
+            query += " AND guild_id = %s"
+            params = (guild_id,)
+
+        async with self.acquire() as conn:
             async with conn.cursor(aiomysql.DictCursor) as cursor:
-                await cursor.execute(
-                    "SELECT * FROM tickets WHERE guild_id = %s AND status = 'open' ORDER BY created_at DESC",
-                    (guild_id,)
-                )
+                await cursor.execute(query + " ORDER BY created_at DESC", params)
                 return await cursor.fetchall()
-        finally:
-            conn.close()
 
+    def open_ticket_stats(self) -> Dict:
+        """Get the size of the open ticket registry"""
+        return {'open_tickets': len(self._open_tickets)}
+
+    @timed
     async def get_user_tickets(self, guild_id: int, user_id: int, limit: int = 10) -> List[Dict]:
         """Get recent tickets for a user"""
-        conn = await self.get_connection()
-        try:
+        async with self.acquire() as conn:
             async with conn.cursor(aiomysql.DictCursor) as cursor:
                 await cursor.execute(
                     "SELECT * FROM tickets WHERE guild_id = %s AND user_id = %s ORDER BY created_at DESC LIMIT %s",
                     (guild_id, user_id, limit)
                 )
                 return await cursor.fetchall()
-        finally:
-            conn.close()
 
+    @timed
     async def add_ticket_participant(self, ticket_id: int, user_id: int, added_by: int) -> bool:
         """Add a participant to a ticket"""
-        conn = await self.get_connection()
-        try:
+        async with self.acquire() as conn:
             async with conn.cursor() as cursor:
                 await cursor.execute(
                     "INSERT IGNORE INTO ticket_participants (ticket_id, user_id, added_by, added_at) VALUES (%s, %s, %s, %s)",
                     (ticket_id, user_id, added_by, datetime.utcnow())
                 )
                 return cursor.rowcount > 0
-        finally:
-            conn.close()
 
+    async def queue_ticket_participant(self, ticket_id: int, user_id: int, added_by: int):
+        """Queue a ticket participant to be written in the background, waiting only if the write queue is full"""
+        if not self.write_queue.running:
+            await self.add_ticket_participant(ticket_id, user_id, added_by)
+            return
+
+        await self.write_queue.put(
+            "ticket_participants",
+            "INSERT IGNORE INTO ticket_participants (ticket_id, user_id, added_by, added_at) VALUES",
+            (ticket_id, user_id, added_by, datetime.utcnow())
+        )
+
+    @timed
     async def remove_ticket_participant(self, ticket_id: int, user_id: int) -> bool:
         """Remove a participant from a ticket"""
-        conn = await self.get_connection()
-        try:
+        async with self.acquire() as conn:
             async with conn.cursor() as cursor:
                 await cursor.execute(
                     "DELETE FROM ticket_participants WHERE ticket_id = %s AND user_id = %s",
                     (ticket_id, user_id)
                 )
                 return cursor.rowcount > 0
-        finally:
-            conn.close()
 
+    @timed
     async def get_ticket_stats(self, guild_id: int) -> Dict:
-        """Get ticket statistics for a guild"""
-        conn = await self.get_connection()
-        try:
-            async with conn.cursor() as cursor:
-                # Total tickets
-                await cursor.execute(
-                    "SELECT COUNT(*) FROM tickets WHERE guild_id = %s",
-                    (guild_id,)
-                )
-                total = (await cursor.fetchone())[0]
+        """Get ticket statistics for a guild, served from the in-memory counters once loaded"""
+        stats = self._ticket_stats.get(guild_id)
+        if stats is None:
+            stats = await self._count_tickets(guild_id)
+            self._ticket_stats[guild_id] = stats
+        return dict(stats)
 
-                # Open tickets
-                await cursor.execute(
-                    "SELECT COUNT(*) FROM tickets WHERE guild_id = %s AND status = 'open'",
-                    (guild_id,)
-                )
-                open_count = (await cursor.fetchone())[0]
+    @timed
+    async def reconcile_ticket_stats(self):
+        """Recount tickets for every cached guild to correct any drift in the in-memory counters"""
+        for guild_id in list(self._ticket_stats):
+            stats = await self._count_tickets(guild_id)
+            if stats != self._ticket_stats.get(guild_id):
+                log.info(f"Corrected ticket stats drift for guild {guild_id}: {self._ticket_stats.get(guild_id)} -> {stats}")
+            self._ticket_stats[guild_id] = stats
 
-                # Closed tickets
+    async def _count_tickets(self, guild_id: int) -> Dict[str, int]:
+        """Count total, open and closed tickets for a guild in a single pass"""
+        async with self.acquire() as conn:
+            async with conn.cursor() as cursor:
                 await cursor.execute(
-                    "SELECT COUNT(*) FROM tickets WHERE guild_id = %s AND status = 'closed'",
+                    """SELECT COUNT(*),
+                              SUM(CASE WHEN status = 'open' THEN 1 ELSE 0 END),
+                              SUM(CASE WHEN status = 'closed' THEN 1 ELSE 0 END)
+                       FROM tickets WHERE guild_id = %s""",
                     (guild_id,)
                 )
-                closed_count = (await cursor.fetchone())[0]
+                total, open_count, closed_count = await cursor.fetchone()
 
-                return {
-                    'total': total,
-                    'open': open_count,
-                    'closed': closed_count
-                }
-        finally:
-            conn.close()
+        return {
+            'total': int(total),
+            'open': int(open_count or 0),
+            'closed': int(closed_count or 0)
+        }
 
     # Server statistics methods for Grafana
+    @timed
     async def update_user_activity(self, guild_id: int, user_id: int):
         """Update the last message time for a user"""
-        conn = await self.get_connection()
-        try:
+        async with self.acquire() as conn:
             async with conn.cursor() as cursor:
                 await cursor.execute(
                     "INSERT INTO user_activity (guild_id, user_id, last_message) VALUES (%s, %s, %s) ON DUPLICATE KEY UPDATE last_message = VALUES(last_message)",
                     (guild_id, user_id, datetime.utcnow())
                 )
-        finally:
-            conn.close()
 
+    def buffer_user_activity(self, guild_id: int, user_id: int) -> bool:
+        """Record a user's last message time in memory. Returns True once the buffer should be flushed.
+
+        After a failed flush this stops asking for inline flushes for activity_retry_interval seconds,
+        leaving retries to the periodic flush, and stops buffering new users once the buffer is full."""
+        key = (guild_id, user_id)
+        if key not in self._activity_buffer and len(self._activity_buffer) >= self.activity_buffer_limit:
+            self.activity_dropped += 1
+            if self.activity_dropped % 1000 == 1:
+                log.warning(f"User activity buffer is full ({self.activity_buffer_limit} users), dropped {self.activity_dropped} update(s)")
+            return False
+
+        self._activity_buffer[key] = datetime.utcnow()
+        if self._activity_flush_failed_at is not None and time.monotonic() - self._activity_flush_failed_at < self.activity_retry_interval:
+            return False
+        return len(self._activity_buffer) >= self.activity_flush_threshold
+
+    @timed
+    async def flush_user_activity(self) -> int:
+        """Write all buffered user activity as one multi-row upsert and return the number of rows written"""
+        if not self._activity_buffer:
+            return 0
+
+        pending, self._activity_buffer = self._activity_buffer, {}
+        rows = [(guild_id, user_id, last_message) for (guild_id, user_id), last_message in pending.items()]
+        try:
+            async with self.acquire() as conn:
+                async with conn.cursor() as cursor:
+                    placeholders = ", ".join(["(%s, %s, %s)"] * len(rows))
+                    await cursor.execute(
+                        f"INSERT INTO user_activity (guild_id, user_id, last_message) VALUES {placeholders} ON DUPLICATE KEY UPDATE last_message = VALUES(last_message)",
+                        [value for row in rows for value in row]
+                    )
+        except Exception:
+            self._activity_flush_failed_at = time.monotonic()
+            # Put the rows back without overwriting activity recorded since the swap
+            for key, last_message in pending.items():
+                if key in self._activity_buffer:
+                    continue
+                if len(self._activity_buffer) >= self.activity_buffer_limit:
+                    self.activity_dropped += 1
+                    continue
+                self._activity_buffer[key] = last_message
+            raise
+
+        self._activity_flush_failed_at = None
+        return len(rows)
+
+    @timed
     async def log_server_stats(self, guild_id: int, total_members: int, online_members: int,
                               idle_members: int, dnd_members: int, offline_members: int):
         """Log server statistics"""
-        conn = await self.get_connection()
-        try:
+        async with self.acquire() as conn:
             async with conn.cursor() as cursor:
                 await cursor.execute(
                     "INSERT INTO server_stats (guild_id, timestamp, total_members, online_members, idle_members, dnd_members, offline_members) VALUES (%s, %s, %s, %s, %s, %s, %s)",
                     (guild_id, datetime.utcnow(), total_members, online_members, idle_members, dnd_members, offline_members)
                 )
-        finally:
-            conn.close()
 
+    @timed
     async def get_server_stats(self, guild_id: int, hours: int = 24) -> List[Dict]:
         """Get server statistics for the past N hours"""
-        conn = await self.get_connection()
-        try:
+        async with self.acquire() as conn:
             async with conn.cursor(aiomysql.DictCursor) as cursor:
                 cutoff_time = datetime.utcnow() - timedelta(hours=hours)
                 await cursor.execute(
@@ -455,13 +807,12 @@ class Database:
                     (guild_id, cutoff_time)
                 )
                 return await cursor.fetchall()
-        finally:
-            conn.close()
 
+    @timed
     async def get_active_users_24h(self, guild_id: int) -> int:
         """Get count of users who were active in the past 24 hours"""
-        conn = await self.get_connection()
-        try:
+        await self.flush_user_activity()
+        async with self.acquire() as conn:
             async with conn.cursor() as cursor:
                 cutoff_time = datetime.utcnow() - timedelta(hours=24)
                 await cursor.execute(
@@ -470,19 +821,128 @@ class Database:
                 )
                 row = await cursor.fetchone()
                 return row[0] if row else 0
-        finally:
-            conn.close()
 
+    @timed
     async def cleanup_old_stats(self, days: int = 30):
-        """Clean up server stats older than specified days"""
-        conn = await self.get_connection()
-        try:
+        """Clean up raw server stats older than specified days that have already been rolled up"""
+        cutoff_time = datetime.utcnow() - timedelta(days=days)
+        deleted = 0
+        async with self.acquire() as conn:
             async with conn.cursor() as cursor:
-                cutoff_time = datetime.utcnow() - timedelta(days=days)
-                await cursor.execute(
-                    "DELETE FROM server_stats WHERE timestamp < %s",
-                    (cutoff_time,)
-                )
-                return cursor.rowcount
-        finally:
-            conn.close()
\ No newline at end of file
+                # Each guild is only rolled up to its own watermark, so never delete past it
+                await cursor.execute("SELECT DISTINCT guild_id FROM server_stats_hourly")
+                for (guild_id,) in await cursor.fetchall():
+                    await cursor.execute(
+                        "SELECT bucket_start FROM server_stats_hourly WHERE guild_id = %s ORDER BY bucket_start DESC LIMIT 1",
+                        (guild_id,)
+                    )
+                    watermark = (await cursor.fetchone())[0]
+                    await cursor.execute(
+                        "DELETE FROM server_stats WHERE guild_id = %s AND timestamp < %s",
+                        (guild_id, min(cutoff_time, watermark + HOUR))
+                    )
+                    deleted += cursor.rowcount
+        return deleted
+
+    @timed
+    async def rollup_server_stats(self) -> Dict[str, int]:
+        """Fold completed hours of raw stats into hourly rollups and completed days of those into daily rollups"""
+        current_hour = floor_time(datetime.utcnow(), HOUR)
+        hourly = await self._rollup_into('server_stats_hourly', 'server_stats', 'timestamp', HOUR, current_hour, ROLLUP_CHUNK_HOURLY)
+        daily = await self._rollup_into('server_stats_daily', 'server_stats_hourly', 'bucket_start', DAY, floor_time(current_hour, DAY), ROLLUP_CHUNK_DAILY)
+        return {'hourly': hourly, 'daily': daily}
+
+    async def _rollup_into(self, target: str, source: str, time_column: str, bucket: timedelta,
+                           until: datetime, chunk: timedelta) -> int:
+        """Aggregate source rows older than until into the target table, continuing each guild from its own
+        last bucket and reading at most one chunk of time per query"""
+        async with self.acquire() as conn:
+            async with conn.cursor(aiomysql.DictCursor) as cursor:
+                await cursor.execute(f"SELECT DISTINCT guild_id FROM {source} WHERE {time_column} < %s", (until,))
+                guild_ids = [row['guild_id'] for row in await cursor.fetchall()]
+
+                written = 0
+                for guild_id in guild_ids:
+                    await cursor.execute(
+                        f"SELECT bucket_start FROM {target} WHERE guild_id = %s ORDER BY bucket_start DESC LIMIT 1",
+                        (guild_id,)
+                    )
+                    watermark = await cursor.fetchone()
+                    start = watermark['bucket_start'] + bucket if watermark is not None else None
+                    while start is None or start < until:
+                        # Jump to the next pending row so gaps in the data cost one query, not one per chunk
+                        if start is None:
+                            await cursor.execute(
+                                f"SELECT {time_column} FROM {source} WHERE guild_id = %s AND {time_column} < %s ORDER BY {time_column} LIMIT 1",
+                                (guild_id, until)
+                            )
+                        else:
+                            await cursor.execute(
+                                f"SELECT {time_column} FROM {source} WHERE guild_id = %s AND {time_column} >= %s AND {time_column} < %s ORDER BY {time_column} LIMIT 1",
+                                (guild_id, start, until)
+                            )
+                        next_row = await cursor.fetchone()
+                        if next_row is None:
+                            break
+
+                        start = floor_time(next_row[time_column], bucket)
+                        end = min(start + chunk, until)
+                        await cursor.execute(
+                            f"SELECT * FROM {source} WHERE guild_id = %s AND {time_column} >= %s AND {time_column} < %s",
+                            (guild_id, start, end)
+                        )
+                        rows = await cursor.fetchall()
+                        if source == 'server_stats':
+                            rows = [raw_as_rollup(row) for row in rows]
+                        written += await self._upsert_rollups(cursor, target, merge_rollups(rows, bucket))
+                        start = end
+        return written
+
+    async def _upsert_rollups(self, cursor, target: str, rollups: List[Dict]) -> int:
+        placeholders = "(" + ", ".join(["%s"] * len(ROLLUP_COLUMNS)) + ")"
+        updates = ", ".join(f"{column} = VALUES({column})" for column in ROLLUP_COLUMNS[2:])
+        for offset in range(0, len(rollups), 500):
+            chunk = rollups[offset:offset + 500]
+            await cursor.execute(
+                f"INSERT INTO {target} ({', '.join(ROLLUP_COLUMNS)}) VALUES {', '.join([placeholders] * len(chunk))} "
+                f"ON DUPLICATE KEY UPDATE {updates}",
+                [rollup[column] for rollup in chunk for column in ROLLUP_COLUMNS]
+            )
+        return len(rollups)
+
+    @timed
+    async def get_server_stats_range(self, guild_id: int, start: datetime, end: Optional[datetime] = None,
+                                     max_points: int = 500, raw_retention_days: int = 30) -> Tuple[str, List[Dict]]:
+        """Get server statistics for a window from the finest resolution that spans it in at most max_points rows.
+        Returns the resolution name and rollup-shaped rows (raw rows are returned as single-sample rollups).
+        Time after the last rolled-up bucket is filled in from the finer tables, so the rows reach up to end."""
+        end = end or datetime.utcnow()
+        raw_since = datetime.utcnow() - timedelta(days=raw_retention_days)
+        resolution = pick_resolution(start, end, max_points, raw_since)
+        bucket = resolution[2]
+
+        rows, tail = [], []
+        async with self.acquire() as conn:
+            async with conn.cursor(aiomysql.DictCursor) as cursor:
+                since = start
+                for name, table, size in RESOLUTIONS[RESOLUTIONS.index(resolution):]:
+                    time_column = 'timestamp' if name == 'raw' else 'bucket_start'
+                    await cursor.execute(
+                        f"""SELECT * FROM {table}
+                           WHERE guild_id = %s AND {time_column} >= %s AND {time_column} < %s
+                           ORDER BY {time_column}""",
+                        (guild_id, since, end)
+                    )
+                    found = [raw_as_rollup(row) if name == 'raw' else dict(row)
+                             for row in await cursor.fetchall()]
+                    if not found:
+                        continue
+                    if name == resolution[0]:
+                        rows = found
+                    else:
+                        tail.extend(found)
+                    since = found[-1]['bucket_start'] + size
+
+        if resolution[0] == 'raw':
+            return 'raw', rows
+        return resolution[0], rows + merge_rollups(tail, bucket)
@@ -0,0 +1,132 @@
+import functools
+import logging
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+log = logging.getLogger(__name__)
+
+# Upper bounds of the latency histogram buckets, in seconds
+LATENCY_BUCKETS: Tuple[float, ...] = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+def describe_value(value: Any) -> str:
+    """Describe the shape of a query parameter without revealing its contents"""
+    if value is None:
+        return "None"
+    if isinstance(value, (str, bytes)):
+        return f"{type(value).__name__}[{len(value)}]"
+    if isinstance(value, (list, tuple, set, dict)):
+        return f"{type(value).__name__}[{len(value)}]"
+    if isinstance(value, datetime):
+        return "datetime"
+    return type(value).__name__
+
+def describe_params(args: tuple, kwargs: dict) -> str:
+    """Describe the shapes of a method call's arguments, e.g. (int, int, str[24])"""
+    shapes = [describe_value(arg) for arg in args]
+    shapes.extend(f"{key}={describe_value(value)}" for key, value in kwargs.items())
+    return f"({', '.join(shapes)})"
+
+def count_rows(result: Any) -> int:
+    """Count the rows a Database method returned: the length of a list of rows, or 1 for a single
+    fetched row. Scalars such as counts, lastrowid and booleans are not rows and count as 0."""
+    if isinstance(result, (list, tuple, set)):
+        return len(result)
+    if isinstance(result, dict):
+        return 1
+    return 0
+
+class QueryStats:
+    """Latency histogram and rolling samples for a single Database method"""
+
+    def __init__(self, max_samples: int = 1024):
+        self.count = 0
+        self.errors = 0
+        self.rows = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self.buckets: List[int] = [0] * len(LATENCY_BUCKETS)
+        self.samples: Deque[float] = deque(maxlen=max_samples)
+
+    def record(self, duration: float, rows: int, failed: bool = False):
+        self.count += 1
+        self.rows += rows
+        self.total_time += duration
+        self.max_time = max(self.max_time, duration)
+        if failed:
+            self.errors += 1
+
+        for index, bound in enumerate(LATENCY_BUCKETS):
+            if duration <= bound:
+                self.buckets[index] += 1
+                break
+        self.samples.append(duration)
+
+    def percentile(self, percent: float) -> float:
+        """Get a latency percentile in seconds from the rolling samples"""
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        index = min(len(ordered) - 1, max(0, round(percent / 100 * len(ordered)) - 1))
+        return ordered[index]
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            'count': self.count,
+            'errors': self.errors,
+            'rows': self.rows,
+            'total_ms': self.total_time * 1000,
+            'avg_ms': self.total_time / self.count * 1000 if self.count else 0.0,
+            'p50_ms': self.percentile(50) * 1000,
+            'p95_ms': self.percentile(95) * 1000,
+            'p99_ms': self.percentile(99) * 1000,
+            'max_ms': self.max_time * 1000,
+            'buckets': list(zip(LATENCY_BUCKETS, self.buckets))
+        }
+
+class QueryMetrics:
+    """Per-method latency histograms and slow query logging for the data layer"""
+
+    def __init__(self, slow_query_threshold: float = 0.25, max_samples: int = 1024):
+        self.slow_query_threshold = slow_query_threshold
+        self.max_samples = max_samples
+        self._stats: Dict[str, QueryStats] = {}
+
+    def record(self, name: str, duration: float, rows: int, args: tuple = (), kwargs: Optional[dict] = None, failed: bool = False):
+        """Record one call of a Database method, logging it if it crossed the slow query threshold"""
+        stats = self._stats.get(name)
+        if stats is None:
+            stats = self._stats[name] = QueryStats(self.max_samples)
+        stats.record(duration, rows, failed)
+
+        if duration >= self.slow_query_threshold:
+            log.warning(f"Slow query: {name}{describe_params(args, kwargs or {})} took {duration * 1000:.1f}ms and returned {rows} row(s)")
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Get a summary of every recorded method, keyed by method name"""
+        return {name: stats.summary() for name, stats in sorted(self._stats.items())}
+
+    def histograms(self) -> Dict[str, QueryStats]:
+        """Get the live stats of every recorded method, keyed by method name"""
+        return dict(self._stats)
+
+    def reset(self):
+        """Drop all recorded samples"""
+        self._stats.clear()
+
+def timed(method):
+    """Record the latency and returned rows of a Database coroutine method in Database.query_metrics.
+    This times the whole method, so calls answered from an in-memory cache are included."""
+    @functools.wraps(method)
+    async def wrapper(self, *args, **kwargs):
+        start = time.perf_counter()
+        result = None
+        failed = True
+        try:
+            result = await method(self, *args, **kwargs)
+            failed = False
+            return result
+        finally:
+            self.query_metrics.record(method.__name__, time.perf_counter() - start, count_rows(result), args, kwargs, failed)
+    return wrapper
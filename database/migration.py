@@ -1,13 +1,26 @@
+import asyncio
+import heapq
 import logging
+import time
 from abc import ABC, abstractmethod
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Iterable, List, Optional, Set, Tuple
 from datetime import datetime
 
 log = logging.getLogger(__name__)
 
+# Columns added to the migrations table after it was first created, with their definitions
+MIGRATIONS_TABLE_COLUMNS = {
+    'status': "VARCHAR(20) NOT NULL DEFAULT 'applied'",
+    'progress': "BIGINT NULL",
+    'checksum': "CHAR(64) NULL"
+}
+
 class Migration(ABC):
     """Base class for database migrations"""
 
+    dialect: str = "mysql"
+    checksum: Optional[str] = None
+
     def __init__(self, migration_number: int, description: str, depends: list[int] = []):
         self.migration_number = migration_number
         self.description = description
@@ -29,6 +42,202 @@ class Migration(ABC):
         """Get the migration name"""
         return f"{self.migration_number:03d}_{self.__class__.__name__.lower()}"
 
+    async def table_columns(self, cursor, table: str) -> set[str]:
+        """Get the column names of a table in the current database"""
+        if self.dialect == "sqlite":
+            await cursor.execute("SELECT name FROM pragma_table_info(%s)", (table,))
+        else:
+            await cursor.execute("""
+                SELECT column_name
+                FROM information_schema.columns
+                WHERE table_schema = DATABASE() AND table_name = %s
+            """, (table,))
+        return {row[0] for row in await cursor.fetchall()}
+
+    async def table_exists(self, cursor, table: str) -> bool:
+        """Check whether a table exists in the current database"""
+        if self.dialect == "sqlite":
+            await cursor.execute("SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' AND name = %s", (table,))
+        else:
+            await cursor.execute("""
+                SELECT COUNT(*) FROM information_schema.tables
+                WHERE table_schema = DATABASE() AND table_name = %s
+            """, (table,))
+        return (await cursor.fetchone())[0] > 0
+
+    async def create_index(self, cursor, table: str, index: str, columns: str):
+        """Create an index unless an index with the same name already exists on the table"""
+        if self.dialect == "sqlite":
+            await cursor.execute(f"CREATE INDEX IF NOT EXISTS {index} ON {table} ({columns})")
+            return
+
+        await cursor.execute("""
+            SELECT COUNT(*) FROM information_schema.statistics
+            WHERE table_schema = DATABASE() AND table_name = %s AND index_name = %s
+        """, (table, index))
+        if (await cursor.fetchone())[0] == 0:
+            await cursor.execute(f"CREATE INDEX {index} ON {table} ({columns})")
+
+    async def drop_index(self, cursor, table: str, index: str):
+        """Drop an index if it exists"""
+        if self.dialect == "sqlite":
+            await cursor.execute(f"DROP INDEX IF EXISTS {index}")
+            return
+
+        await cursor.execute("""
+            SELECT COUNT(*) FROM information_schema.statistics
+            WHERE table_schema = DATABASE() AND table_name = %s AND index_name = %s
+        """, (table, index))
+        if (await cursor.fetchone())[0] > 0:
+            await cursor.execute(f"DROP INDEX {index} ON {table}")
+
+    async def rename_tables(self, cursor, *renames: tuple[str, str]):
+        """Rename tables as (old, new) pairs, atomically where the backend supports it"""
+        if self.dialect == "sqlite":
+            for old, new in renames:
+                await cursor.execute(f"ALTER TABLE {old} RENAME TO {new}")
+        else:
+            await cursor.execute("RENAME TABLE " + ", ".join(f"{old} TO {new}" for old, new in renames))
+
+class OnlineMigration(Migration):
+    """Base class for data migrations that copy a table into a reshaped shadow table in primary
+    key ranges, pausing between chunks, and then swap the shadow table in with a single rename.
+
+    Progress is saved in the migrations table after every chunk, so an interrupted copy resumes
+    where it stopped. Rows inserted while copying are picked up by a final copy that runs with the
+    table write-locked in the same step as the swap (renaming locked tables needs MySQL 8.0.13+),
+    but updates and deletes of rows that were already copied are not, so this suits append-mostly
+    tables with an integer primary key such as mod_actions or server_stats.
+
+    Database.init_db leaves online migrations pending so they do not hold up startup. The bot
+    applies them in the background once it is connected, or they can be run with python -m database."""
+
+    table: str
+    primary_key: str = "id"
+    chunk_size: int = 1000
+    throttle: float = 0.05
+
+    @property
+    def shadow_table(self) -> str:
+        return f"{self.table}_shadow"
+
+    @property
+    def backup_table(self) -> str:
+        return f"{self.table}_backup"
+
+    @abstractmethod
+    def shadow_schema(self) -> str:
+        """CREATE TABLE statement for the new layout, named self.shadow_table"""
+        pass
+
+    @abstractmethod
+    def copy_query(self) -> str:
+        """INSERT ... SELECT copying rows of self.table whose primary key is > %s and <= %s into
+        self.shadow_table. It must be safe to repeat for a range, e.g. by keeping primary keys
+        and using INSERT IGNORE. The final range is copied under LOCK TABLES, so the query must
+        refer to both tables by their plain names and not use table aliases."""
+        pass
+
+    async def needs_migration(self, cursor) -> bool:
+        """Check whether the table still has to be reshaped. Return False to skip the copy."""
+        return True
+
+    async def apply(self, connection) -> bool:
+        """Copy the table into the shadow table chunk by chunk and swap it in"""
+        async with connection.cursor() as cursor:
+            progress = await self.load_progress(cursor)
+            if progress is not None and await self.already_swapped(cursor):
+                log.info(f"{self.name}: {self.table} was swapped in before the last run stopped, marking it applied")
+                return True
+
+            if progress is None:
+                if not await self.needs_migration(cursor):
+                    return False
+
+                await cursor.execute(f"DROP TABLE IF EXISTS {self.shadow_table}")
+                await cursor.execute(self.shadow_schema())
+                await cursor.execute(f"SELECT MIN({self.primary_key}) FROM {self.table}")
+                lowest = (await cursor.fetchone())[0]
+                progress = lowest - 1 if lowest is not None else 0
+                await self.save_progress(cursor, progress)
+            else:
+                log.info(f"Resuming {self.name} after {self.primary_key} {progress}")
+
+            copied_chunks = 0
+            while True:
+                await cursor.execute(f"SELECT MAX({self.primary_key}) FROM {self.table}")
+                highest = (await cursor.fetchone())[0]
+                if highest is None or progress >= highest:
+                    break
+
+                while progress < highest:
+                    upper = min(progress + self.chunk_size, highest)
+                    await cursor.execute(self.copy_query(), (progress, upper))
+                    progress = upper
+                    await self.save_progress(cursor, progress)
+                    copied_chunks += 1
+                    if copied_chunks % 100 == 0:
+                        log.info(f"{self.name}: copied {self.table} up to {self.primary_key} {progress} of {highest}")
+                    await asyncio.sleep(self.throttle)
+
+            await cursor.execute(f"DROP TABLE IF EXISTS {self.backup_table}")
+            # Rows inserted since the last MAX() read would be lost by the swap, so block writes to the
+            # table and copy them in the same step as the rename
+            await self.lock_tables(cursor)
+            try:
+                await cursor.execute(f"SELECT MAX({self.primary_key}) FROM {self.table}")
+                highest = (await cursor.fetchone())[0]
+                if highest is not None and progress < highest:
+                    await cursor.execute(self.copy_query(), (progress, highest))
+                    progress = highest
+                    copied_chunks += 1
+                await self.rename_tables(cursor, (self.table, self.backup_table), (self.shadow_table, self.table))
+            finally:
+                await self.unlock_tables(cursor)
+            log.info(f"{self.name}: swapped in the new {self.table} after {copied_chunks} chunk(s), previous table kept as {self.backup_table}")
+        return True
+
+    async def already_swapped(self, cursor) -> bool:
+        """Check whether an interrupted run got as far as the rename, leaving no shadow table and the old table as the backup"""
+        return not await self.table_exists(cursor, self.shadow_table) and await self.table_exists(cursor, self.backup_table)
+
+    async def lock_tables(self, cursor):
+        """Block other writers to the table and its shadow until unlock_tables.
+        The SQLite backend already gives the migration exclusive use of its only connection."""
+        if self.dialect != "sqlite":
+            await cursor.execute(f"LOCK TABLES {self.table} WRITE, {self.shadow_table} WRITE")
+
+    async def unlock_tables(self, cursor):
+        if self.dialect != "sqlite":
+            await cursor.execute("UNLOCK TABLES")
+
+    async def rollback(self, connection) -> bool:
+        """Swap the previous table back in"""
+        async with connection.cursor() as cursor:
+            if not await self.table_exists(cursor, self.backup_table):
+                return False
+
+            await self.rename_tables(cursor, (self.table, self.shadow_table), (self.backup_table, self.table))
+            await cursor.execute(f"DROP TABLE IF EXISTS {self.shadow_table}")
+        return True
+
+    async def load_progress(self, cursor) -> Optional[int]:
+        """Get the last copied primary key of an interrupted run, if any"""
+        await cursor.execute(
+            "SELECT progress FROM migrations WHERE migration_number = %s AND status = 'running'",
+            (self.migration_number,)
+        )
+        row = await cursor.fetchone()
+        return row[0] if row else None
+
+    async def save_progress(self, cursor, progress: int):
+        """Record the last copied primary key"""
+        await cursor.execute("""
+            INSERT INTO migrations (migration_number, name, description, applied_at, status, progress)
+            VALUES (%s, %s, %s, %s, 'running', %s)
+            ON DUPLICATE KEY UPDATE status = VALUES(status), progress = VALUES(progress)
+        """, (self.migration_number, self.name, self.description, datetime.utcnow(), progress))
+
 class MigrationManager:
     """Manages database migrations"""
     
@@ -36,141 +245,263 @@ class MigrationManager:
         self.database = database
         self.migrations: Dict[int, Migration] = {}
         self.dependencies: Dict[int, list[int]] = {}
+        self.files: Dict[int, Any] = {}
+        self.timings: Dict[int, float] = {}
     
     def register_migration(self, migration: Migration):
         """Register a migration"""
-        if migration.migration_number in self.migrations:
+        if migration.migration_number in self.migrations or migration.migration_number in self.files:
             raise ValueError(f"Migration {migration.migration_number} already registered")
+        self._add_migration(migration)
+
+    def register_file(self, migration_file):
+        """Register a migration file, which is only imported once the migration is needed"""
+        if migration_file.migration_number in self.migrations or migration_file.migration_number in self.files:
+            raise ValueError(f"Migration {migration_file.migration_number} already registered")
+        self.files[migration_file.migration_number] = migration_file
+
+    def _add_migration(self, migration: Migration):
+        migration.dialect = self.database.backend.dialect
         self.migrations[migration.migration_number] = migration
         self.dependencies[migration.migration_number] = migration.depends
 
-    async def init_migrations_table(self):
+    def get_migration(self, migration_number: int) -> Migration:
+        """Get a registered migration, importing its file on first use"""
+        migration = self.migrations.get(migration_number)
+        if migration is None:
+            migration = self.files[migration_number].load()
+            self._add_migration(migration)
+        return migration
+
+    def load_all(self):
+        """Import every registered migration file"""
+        for migration_number in self.files:
+            self.get_migration(migration_number)
+
+    def check_checksums(self, applied: Dict[int, Dict[str, Any]]) -> Tuple[List[int], List[int]]:
+        """Compare applied migrations with their files.
+        Returns the migrations whose files changed since they were applied and those applied without a checksum."""
+        edited, unrecorded = [], []
+        for migration_number, info in applied.items():
+            migration_file = self.files.get(migration_number)
+            if migration_file is None:
+                continue
+            if info['checksum'] is None:
+                unrecorded.append(migration_number)
+            elif info['checksum'] != migration_file.checksum:
+                edited.append(migration_number)
+        return edited, unrecorded
+
+    async def init_migrations_table(self, cursor):
         """Create the migrations tracking table if it doesn't exist"""
-        conn = await self.database.get_connection()
-        try:
-            async with conn.cursor() as cursor:
-                await cursor.execute("""
-                    CREATE TABLE IF NOT EXISTS migrations (
-                        migration_number INT PRIMARY KEY,
-                        name VARCHAR(255) NOT NULL,
-                        description TEXT,
-                        applied_at DATETIME NOT NULL,
-                        INDEX idx_applied_at (applied_at)
-                    ) ENGINE=InnoDB
-                """)
-        finally:
-            conn.close()
+        await cursor.execute("""
+            CREATE TABLE IF NOT EXISTS migrations (
+                migration_number INT PRIMARY KEY,
+                name VARCHAR(255) NOT NULL,
+                description TEXT,
+                applied_at DATETIME NOT NULL,
+                status VARCHAR(20) NOT NULL DEFAULT 'applied',
+                progress BIGINT NULL,
+                checksum CHAR(64) NULL,
+                INDEX idx_applied_at (applied_at)
+            ) ENGINE=InnoDB
+        """)
     
-    async def get_applied_migrations(self) -> Dict[int, Dict[str, Any]]:
-        """Get all applied migrations"""
-        conn = await self.database.get_connection()
+    async def get_applied_migrations(self, cursor) -> Dict[int, Dict[str, Any]]:
+        """Get all applied migrations, creating the migrations table on first run and adding
+        any columns it is missing. Migrations that are still running are not included."""
         try:
-            async with conn.cursor() as cursor:
-                await cursor.execute("""
-                    SELECT migration_number, name, description, applied_at
-                    FROM migrations
-                    ORDER BY migration_number
-                """)
-                rows = await cursor.fetchall()
-                return {
-                    row[0]: {
-                        'name': row[1],
-                        'description': row[2],
-                        'applied_at': row[3]
-                    }
-                    for row in rows
-                }
-        finally:
-            conn.close()
+            await cursor.execute("SELECT * FROM migrations ORDER BY migration_number")
+        except Exception as e:
+            if not await self._migrations_table_missing(cursor):
+                raise
+            log.info(f"Migrations table not found, creating it ({e})")
+            await self.init_migrations_table(cursor)
+            return {}
+
+        columns = [column[0] for column in cursor.description]
+        rows = [dict(zip(columns, row)) for row in await cursor.fetchall()]
+
+        for column, definition in MIGRATIONS_TABLE_COLUMNS.items():
+            if column not in columns:
+                log.info(f"Adding {column} column to the migrations table")
+                await cursor.execute(f"ALTER TABLE migrations ADD COLUMN {column} {definition}")
+
+        return {
+            row['migration_number']: {
+                'name': row['name'],
+                'description': row['description'],
+                'applied_at': row['applied_at'],
+                'checksum': row.get('checksum')
+            }
+            for row in rows
+            if row.get('status', 'applied') == 'applied'
+        }
+
+    async def _migrations_table_missing(self, cursor) -> bool:
+        if self.database.backend.dialect == "sqlite":
+            await cursor.execute("SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' AND name = 'migrations'")
+        else:
+            await cursor.execute("""
+                SELECT COUNT(*) FROM information_schema.tables
+                WHERE table_schema = DATABASE() AND table_name = 'migrations'
+            """)
+        return (await cursor.fetchone())[0] == 0
     
-    async def mark_migration_applied(self, migration: Migration):
+    async def mark_migration_applied(self, cursor, migration: Migration):
         """Mark a migration as applied"""
-        conn = await self.database.get_connection()
-        try:
-            async with conn.cursor() as cursor:
-                await cursor.execute("""
-                    INSERT INTO migrations (migration_number, name, description, applied_at)
-                    VALUES (%s, %s, %s, %s)
-                    ON DUPLICATE KEY UPDATE applied_at = VALUES(applied_at)
-                """, (
-                    migration.migration_number,
-                    migration.name,
-                    migration.description,
-                    datetime.utcnow()
-                ))
-        finally:
-            conn.close()
+        await cursor.execute("""
+            INSERT INTO migrations (migration_number, name, description, applied_at, status, checksum)
+            VALUES (%s, %s, %s, %s, 'applied', %s)
+            ON DUPLICATE KEY UPDATE applied_at = VALUES(applied_at), status = VALUES(status), checksum = VALUES(checksum)
+        """, (
+            migration.migration_number,
+            migration.name,
+            migration.description,
+            datetime.utcnow(),
+            migration.checksum
+        ))
     
-    async def mark_migration_rolled_back(self, migration_number: int):
+    async def mark_migration_rolled_back(self, cursor, migration_number: int):
         """Remove migration from applied migrations"""
-        conn = await self.database.get_connection()
-        try:
+        await cursor.execute(
+            "DELETE FROM migrations WHERE migration_number = %s",
+            (migration_number,)
+        )
+
+    def plan(self, applied: Iterable[int]) -> List[Migration]:
+        """Order the pending migrations so every migration comes after its dependencies, importing only those.
+        Ties are broken by migration number; unknown dependencies and cycles raise ValueError."""
+        applied = set(applied)
+        pending = {number for number in set(self.migrations) | set(self.files) if number not in applied}
+        for number in pending:
+            self.get_migration(number)
+
+        waiting_on: Dict[int, int] = {}
+        dependants: Dict[int, List[int]] = {number: [] for number in pending}
+        for number in pending:
+            unmet = 0
+            for dependency in self.dependencies[number]:
+                if dependency in pending:
+                    dependants[dependency].append(number)
+                    unmet += 1
+                elif dependency not in applied:
+                    raise ValueError(f"Migration {number} depends on unknown migration {dependency}")
+            waiting_on[number] = unmet
+
+        ready = [number for number, unmet in waiting_on.items() if unmet == 0]
+        heapq.heapify(ready)
+        ordered: List[Migration] = []
+        while ready:
+            number = heapq.heappop(ready)
+            ordered.append(self.migrations[number])
+            for dependant in dependants[number]:
+                waiting_on[dependant] -= 1
+                if waiting_on[dependant] == 0:
+                    heapq.heappush(ready, dependant)
+
+        if len(ordered) != len(pending):
+            cycle = sorted(number for number, unmet in waiting_on.items() if unmet > 0)
+            raise ValueError(f"Migration dependency cycle between {cycle}")
+        return ordered
+
+    async def pending_migrations(self) -> List[Migration]:
+        """Get the migrations that run_migrations would apply, in order, without applying them"""
+        async with self.database.acquire() as conn:
             async with conn.cursor() as cursor:
-                await cursor.execute(
-                    "DELETE FROM migrations WHERE migration_number = %s",
-                    (migration_number,)
-                )
-        finally:
-            conn.close()
+                applied = await self.get_applied_migrations(cursor)
+        return self.plan(applied)
     
-    async def run_migrations(self):
-        """Run all pending migrations"""
-        await self.init_migrations_table()
-        applied_migrations = await self.get_applied_migrations()
-        
-        # Sort migrations by number
-        sorted_migrations = sorted(self.migrations.items())
-        
-        for migration_number, migration in sorted_migrations:
-            if migration_number not in applied_migrations:
-                log.info(f"Applying migration {migration.name}: {migration.description}")
-                
-                if migration.depends:
-                    log.info(f"Migration {migration.name} depends on {migration.depends}, checking dependencies")
-                    for dep_mig_num in migration.depends:
-                        if dep_mig_num not in applied_migrations:
-                            log.info(f"Dependency migration {dep_mig_num} not applied, applying it first")
-                            await self.run_migrations()  
-                            break 
-                try:
-                    was_applied = await migration.apply(await self.database.get_connection())
+    async def run_migrations(self, include_online: bool = True) -> List[Migration]:
+        """Apply all pending migrations in dependency order on a single connection.
+        With include_online=False, online migrations and the migrations that depend on them are left pending."""
+        async with self.database.acquire() as conn:
+            async with conn.cursor() as cursor:
+                applied = await self.get_applied_migrations(cursor)
+                await self._verify_checksums(cursor, applied)
+                plan = self.plan(applied)
+                if not include_online:
+                    plan = self._defer_online(plan)
+                if not plan:
+                    log.debug("All migrations already applied")
+                    return plan
+
+                log.info(f"Applying {len(plan)} migration(s): {', '.join(migration.name for migration in plan)}")
+                for migration in plan:
+                    log.info(f"Applying migration {migration.name}: {migration.description}")
+                    start = time.perf_counter()
+                    try:
+                        was_applied = await migration.apply(conn)
+                    except Exception as e:
+                        log.error(f"Failed to apply migration {migration.name}: {e}")
+                        raise
+
+                    await self.mark_migration_applied(cursor, migration)
+                    self.timings[migration.migration_number] = time.perf_counter() - start
                     if was_applied:
-                        await self.mark_migration_applied(migration)
-                        log.info(f"Successfully applied migration {migration.name}")
+                        log.info(f"Successfully applied migration {migration.name} in {self.timings[migration.migration_number] * 1000:.1f}ms")
                     else:
                         log.info(f"Migration {migration.name} was already applied")
-                        await self.mark_migration_applied(migration)
-                except Exception as e:
-                    log.error(f"Failed to apply migration {migration.name}: {e}")
-                    raise
-            else:
-                log.debug(f"Migration {migration.name} already applied")
+        return plan
     
+    def _defer_online(self, plan: List[Migration]) -> List[Migration]:
+        """Drop online migrations, and everything that depends on one, from a plan"""
+        deferred: Set[int] = set()
+        runnable = []
+        for migration in plan:
+            if isinstance(migration, OnlineMigration) or any(dependency in deferred for dependency in migration.depends):
+                deferred.add(migration.migration_number)
+            else:
+                runnable.append(migration)
+
+        if deferred:
+            log.info(f"Deferring {len(deferred)} migration(s) that copy tables online: {', '.join(map(str, sorted(deferred)))}")
+        return runnable
+
+    async def _verify_checksums(self, cursor, applied: Dict[int, Dict[str, Any]]):
+        """Warn about applied migrations whose files were edited and record checksums that are missing"""
+        edited, unrecorded = self.check_checksums(applied)
+        for migration_number in edited:
+            log.warning(f"Migration {self.files[migration_number].filename} was edited after it was applied, it will not be run again")
+
+        if unrecorded:
+            await cursor.executemany(
+                "UPDATE migrations SET checksum = %s WHERE migration_number = %s",
+                [(self.files[migration_number].checksum, migration_number) for migration_number in unrecorded]
+            )
+            log.info(f"Recorded checksums for {len(unrecorded)} previously applied migration(s)")
+
     async def rollback_migration(self, migration_number: int) -> bool:
         """Rollback a specific migration"""
-        if migration_number not in self.migrations:
+        if migration_number not in self.migrations and migration_number not in self.files:
             log.error(f"Migration {migration_number} not found")
             return False
-        
-        applied_migrations = await self.get_applied_migrations()
-        if migration_number not in applied_migrations:
-            log.info(f"Migration {migration_number} is not applied")
-            return False
-        
+        self.load_all()
+
+        async with self.database.acquire() as conn:
+            async with conn.cursor() as cursor:
+                applied = await self.get_applied_migrations(cursor)
+                if migration_number not in applied:
+                    log.info(f"Migration {migration_number} is not applied")
+                    return False
+                return await self._rollback(conn, cursor, migration_number, applied)
+
+    async def _rollback(self, conn, cursor, migration_number: int, applied: Dict[int, Dict[str, Any]]) -> bool:
         migration = self.migrations[migration_number]
         log.info(f"Rolling back migration {migration.name}")
         
-        dependants = self.get_dependants(migration_number)
+        dependants = [number for number in self.get_dependants(migration_number) if number in applied]
         if dependants:
             log.info("Dependent migrations found, rolling them back first")
             for dep_mig_num in dependants:
-                await self.rollback_migration(dep_mig_num)
+                await self._rollback(conn, cursor, dep_mig_num, applied)
                 log.info(f"Successfully rolled back dependent migration {dep_mig_num}")
 
         try:
-            success = await migration.rollback(await self.database.get_connection())
+            success = await migration.rollback(conn)
             if success:
-                await self.mark_migration_rolled_back(migration_number)
+                await self.mark_migration_rolled_back(cursor, migration_number)
+                applied.pop(migration_number, None)
                 log.info(f"Successfully rolled back migration {migration.name}")
             return success
         except Exception as e:
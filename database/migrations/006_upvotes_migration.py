@@ -7,13 +7,7 @@ class UpvotesMigration(Migration):
     async def apply(self, connection) -> bool:
         """Migrate upvotes table structure if needed"""
         async with connection.cursor() as cursor:
-            await cursor.execute("""
-                SELECT column_name
-                FROM information_schema.columns
-                WHERE table_schema = DATABASE() AND table_name = 'upvotes'
-                ORDER BY ORDINAL_POSITION
-            """)
-            columns = {row[0] for row in await cursor.fetchall()}
+            columns = await self.table_columns(cursor, 'upvotes')
             is_old_schema = columns == {'user_id', 'showcase_id'}
 
             if not is_old_schema:
@@ -34,29 +28,17 @@ class UpvotesMigration(Migration):
                 GROUP BY showcase_id
             """)
 
-            await cursor.execute("""
-                RENAME TABLE
-                    upvotes TO upvotes_backup,
-                    upvotes_new TO upvotes
-            """)
+            await self.rename_tables(cursor, ('upvotes', 'upvotes_backup'), ('upvotes_new', 'upvotes'))
 
             return True
     
     async def rollback(self, connection) -> bool:
         """Rollback upvotes migration"""
         async with connection.cursor() as cursor:
-            await cursor.execute("""
-                SELECT COUNT(*) FROM information_schema.tables
-                WHERE table_schema = DATABASE() AND table_name = 'upvotes_backup'
-            """)
-            backup_exists = (await cursor.fetchone())[0] > 0
+            backup_exists = await self.table_exists(cursor, 'upvotes_backup')
             
             if backup_exists:
-                await cursor.execute("""
-                    RENAME TABLE
-                        upvotes TO upvotes_migrated,
-                        upvotes_backup TO upvotes
-                """)
+                await self.rename_tables(cursor, ('upvotes', 'upvotes_migrated'), ('upvotes_backup', 'upvotes'))
                 await cursor.execute("DROP TABLE IF EXISTS upvotes_migrated")
                 return True
             
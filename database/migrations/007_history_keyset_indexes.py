@@ -0,0 +1,19 @@
+from database.migration import Migration
+
+class HistoryKeysetIndexes(Migration):
+    def __init__(self):
+        super().__init__(7, "Add (guild_id, user_id, timestamp, id) indexes for paginated warnings and history", [1])
+    
+    async def apply(self, connection) -> bool:
+        """Create keyset pagination indexes"""
+        async with connection.cursor() as cursor:
+            await self.create_index(cursor, 'warnings', 'idx_warnings_keyset', 'guild_id, user_id, timestamp, id')
+            await self.create_index(cursor, 'mod_actions', 'idx_mod_actions_keyset', 'guild_id, user_id, timestamp, id')
+        return True
+    
+    async def rollback(self, connection) -> bool:
+        """Drop keyset pagination indexes"""
+        async with connection.cursor() as cursor:
+            await self.drop_index(cursor, 'mod_actions', 'idx_mod_actions_keyset')
+            await self.drop_index(cursor, 'warnings', 'idx_warnings_keyset')
+        return True
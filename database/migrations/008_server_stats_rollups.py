@@ -0,0 +1,36 @@
+from database.migration import Migration
+
+STAT_COLUMNS = ('total_members', 'online_members', 'idle_members', 'dnd_members', 'offline_members')
+
+def rollup_table_ddl(table: str) -> str:
+    aggregates = ",\n".join(
+        f"{column}_min INT NOT NULL,\n{column}_max INT NOT NULL,\n{column}_avg DOUBLE NOT NULL"
+        for column in STAT_COLUMNS
+    )
+    return f"""
+        CREATE TABLE IF NOT EXISTS {table} (
+            guild_id BIGINT NOT NULL,
+            bucket_start DATETIME NOT NULL,
+            samples INT NOT NULL,
+            {aggregates},
+            PRIMARY KEY (guild_id, bucket_start)
+        ) ENGINE=InnoDB
+    """
+
+class ServerStatsRollups(Migration):
+    def __init__(self):
+        super().__init__(8, "Create hourly and daily server statistics rollup tables", [5])
+    
+    async def apply(self, connection) -> bool:
+        """Create rollup tables"""
+        async with connection.cursor() as cursor:
+            await cursor.execute(rollup_table_ddl("server_stats_hourly"))
+            await cursor.execute(rollup_table_ddl("server_stats_daily"))
+        return True
+    
+    async def rollback(self, connection) -> bool:
+        """Drop rollup tables"""
+        async with connection.cursor() as cursor:
+            await cursor.execute("DROP TABLE IF EXISTS server_stats_daily")
+            await cursor.execute("DROP TABLE IF EXISTS server_stats_hourly")
+        return True
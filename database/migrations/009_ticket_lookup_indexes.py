@@ -0,0 +1,19 @@
+from database.migration import Migration
+
+class TicketLookupIndexes(Migration):
+    def __init__(self):
+        super().__init__(9, "Add (guild_id, status, created_at) and channel_id indexes to tickets", [4])
+    
+    async def apply(self, connection) -> bool:
+        """Create ticket lookup indexes"""
+        async with connection.cursor() as cursor:
+            await self.create_index(cursor, 'tickets', 'idx_tickets_guild_status', 'guild_id, status, created_at')
+            await self.create_index(cursor, 'tickets', 'idx_tickets_channel', 'channel_id')
+        return True
+    
+    async def rollback(self, connection) -> bool:
+        """Drop ticket lookup indexes"""
+        async with connection.cursor() as cursor:
+            await self.drop_index(cursor, 'tickets', 'idx_tickets_channel')
+            await self.drop_index(cursor, 'tickets', 'idx_tickets_guild_status')
+        return True
@@ -1,33 +1,71 @@
 import os
+import re
+import hashlib
 import importlib
-from typing import List
+import logging
+from typing import List, Optional
 from ..migration import Migration
 
-def discover_migrations() -> List[Migration]:
-    """Dynamically discover and instantiate all migration classes"""
-    migrations = []
+log = logging.getLogger(__name__)
+
+MIGRATION_FILENAME = re.compile(r'^(\d+)_\w+\.py$')
+
+class MigrationFile:
+    """A migration module on disk, identified by the number in its filename and the hash of its
+    contents. The module is only imported when the migration itself is needed."""
+
+    def __init__(self, migration_number: int, filename: str, checksum: str):
+        self.migration_number = migration_number
+        self.filename = filename
+        self.checksum = checksum
+        self._migration: Optional[Migration] = None
+
+    def load(self) -> Migration:
+        """Import the module and instantiate the migration class defined in it"""
+        if self._migration is not None:
+            return self._migration
+
+        module_name = self.filename[:-3]
+        try:
+            module = importlib.import_module(f'.{module_name}', package=__name__)
+        except Exception as e:
+            log.error(f"Could not import migration {self.filename}: {e}")
+            raise RuntimeError(f"Could not import migration {self.filename}") from e
+
+        classes = [
+            attr for attr in vars(module).values()
+            if isinstance(attr, type) and issubclass(attr, Migration) and attr.__module__ == module.__name__
+        ]
+        if len(classes) != 1:
+            log.error(f"Migration {self.filename} must define exactly one Migration class, found {len(classes)}")
+            raise RuntimeError(f"Migration {self.filename} must define exactly one Migration class, found {len(classes)}")
+
+        migration = classes[0]()
+        if migration.migration_number != self.migration_number:
+            log.error(f"Migration {self.filename} declares number {migration.migration_number}, expected {self.migration_number}")
+            raise RuntimeError(f"Migration {self.filename} declares number {migration.migration_number}, expected {self.migration_number}")
+
+        migration.checksum = self.checksum
+        self._migration = migration
+        return migration
+
+def discover_migrations() -> List[MigrationFile]:
+    """Find migration files by their numbered filenames without importing them"""
     migrations_dir = os.path.dirname(__file__)
-    
-    # Get all Python files in the migrations directory
-    for filename in os.listdir(migrations_dir):
-        if filename.endswith('.py') and filename != '__init__.py':
-            module_name = filename[:-3]  # Remove .py extension
-            
-            try:
-                # Import the module
-                module = importlib.import_module(f'.{module_name}', package=__name__)
-                
-                # Find Migration classes in the module
-                for attr_name in dir(module):
-                    attr = getattr(module, attr_name)
-                    if (isinstance(attr, type) and 
-                        issubclass(attr, Migration) and 
-                        attr != Migration):
-                        # Instantiate the migration
-                        migration_instance = attr()
-                        migrations.append(migration_instance)
-                        
-            except Exception as e:
-                print(f"Warning: Could not load migration from {filename}: {e}")
-    
-    return migrations
\ No newline at end of file
+    files = {}
+
+    for filename in sorted(os.listdir(migrations_dir)):
+        match = MIGRATION_FILENAME.match(filename)
+        if not match:
+            continue
+
+        migration_number = int(match.group(1))
+        if migration_number in files:
+            log.error(f"Migration number {migration_number} is used by both {files[migration_number].filename} and {filename}")
+            raise RuntimeError(f"Migration number {migration_number} is used by both {files[migration_number].filename} and {filename}")
+
+        with open(os.path.join(migrations_dir, filename), 'rb') as f:
+            checksum = hashlib.sha256(f.read()).hexdigest()
+        files[migration_number] = MigrationFile(migration_number, filename, checksum)
+
+    return list(files.values())
@@ -0,0 +1,70 @@
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Tuple
+
+STAT_COLUMNS = ('total_members', 'online_members', 'idle_members', 'dnd_members', 'offline_members')
+AGGREGATES = ('min', 'max', 'avg')
+ROLLUP_COLUMNS = ('guild_id', 'bucket_start', 'samples') + tuple(
+    f"{column}_{aggregate}" for column in STAT_COLUMNS for aggregate in AGGREGATES
+)
+
+RAW_INTERVAL = timedelta(minutes=5)
+HOUR = timedelta(hours=1)
+DAY = timedelta(days=1)
+
+# How much source time a single rollup query reads for one guild
+ROLLUP_CHUNK_HOURLY = timedelta(days=1)
+ROLLUP_CHUNK_DAILY = timedelta(days=31)
+
+# Available resolutions from coarsest to finest as (name, table, bucket size)
+RESOLUTIONS = (
+    ('daily', 'server_stats_daily', DAY),
+    ('hourly', 'server_stats_hourly', HOUR),
+    ('raw', 'server_stats', RAW_INTERVAL),
+)
+
+def floor_time(value: datetime, bucket: timedelta) -> datetime:
+    """Round a time down to the start of its bucket"""
+    return datetime.min + (value - datetime.min) // bucket * bucket
+
+def raw_as_rollup(row: Dict) -> Dict:
+    """Express a raw server_stats row as a single-sample rollup row"""
+    rollup = {'guild_id': row['guild_id'], 'bucket_start': row['timestamp'], 'samples': 1}
+    for column in STAT_COLUMNS:
+        for aggregate in AGGREGATES:
+            rollup[f"{column}_{aggregate}"] = row[column]
+    return rollup
+
+def merge_rollups(rows: Iterable[Dict], bucket: timedelta) -> List[Dict]:
+    """Merge rollup rows into coarser buckets, weighting averages by their sample counts"""
+    merged: Dict[Tuple[int, datetime], Dict] = {}
+    for row in rows:
+        key = (row['guild_id'], floor_time(row['bucket_start'], bucket))
+        target = merged.get(key)
+        if target is None:
+            target = merged[key] = {'guild_id': key[0], 'bucket_start': key[1], 'samples': 0}
+            for column in STAT_COLUMNS:
+                target[f"{column}_min"] = row[f"{column}_min"]
+                target[f"{column}_max"] = row[f"{column}_max"]
+                target[f"{column}_avg"] = 0.0
+
+        samples = row['samples']
+        for column in STAT_COLUMNS:
+            target[f"{column}_min"] = min(target[f"{column}_min"], row[f"{column}_min"])
+            target[f"{column}_max"] = max(target[f"{column}_max"], row[f"{column}_max"])
+            target[f"{column}_avg"] += row[f"{column}_avg"] * samples
+        target['samples'] += samples
+
+    for target in merged.values():
+        for column in STAT_COLUMNS:
+            target[f"{column}_avg"] /= target['samples']
+    return sorted(merged.values(), key=lambda target: (target['guild_id'], target['bucket_start']))
+
+def pick_resolution(start: datetime, end: datetime, max_points: int, raw_since: datetime) -> Tuple[str, str, timedelta]:
+    """Pick the finest resolution whose buckets are at least as wide as the window split into max_points,
+    so the window spans at most max_points buckets, falling back to the coarsest resolution"""
+    step = (end - start) / max(1, max_points)
+    available = [resolution for resolution in RESOLUTIONS if resolution[0] != 'raw' or start >= raw_since]
+    for resolution in reversed(available):
+        if resolution[2] >= step:
+            return resolution
+    return available[0]
@@ -0,0 +1,130 @@
+import asyncio
+import logging
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+log = logging.getLogger(__name__)
+
+# A queued row: (metric name, statement prefix ending in VALUES, row parameters)
+QueuedWrite = Tuple[str, str, Sequence[Any]]
+
+class WriteQueue:
+    """Bounded queue of fire-and-forget inserts, written by a pool of workers that
+    batch rows sharing the same statement prefix into multi-row INSERTs"""
+
+    def __init__(self, database, maxsize: int = 1000, workers: int = 2, batch_size: int = 100):
+        self.database = database
+        self.workers = workers
+        self.batch_size = batch_size
+        self.written = 0
+        self.batches = 0
+        self.failed = 0
+        self.dropped = 0
+        self.full_waits = 0
+        self._last_full_warning = 0.0
+        self._queue: "asyncio.Queue[QueuedWrite]" = asyncio.Queue(maxsize)
+        self._tasks: List[asyncio.Task] = []
+        self._closed = False
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    def start(self):
+        """Start the worker tasks"""
+        if self._tasks:
+            return
+
+        self._closed = False
+        self._tasks = [asyncio.create_task(self._worker(), name=f"write-queue-{index}") for index in range(self.workers)]
+
+    async def put(self, name: str, prefix: str, row: Sequence[Any]):
+        """Queue a row for insertion, waiting for space if the queue is full.
+        Rows put after close() has started are logged and dropped."""
+        if self._closed:
+            self.dropped += 1
+            log.warning(f"Dropped {name} row queued after the write queue was closed")
+            return
+
+        if self._queue.full():
+            self.full_waits += 1
+            if time.monotonic() - self._last_full_warning >= 10:
+                self._last_full_warning = time.monotonic()
+                log.warning(f"Write queue is full ({self._queue.maxsize} rows), callers are waiting for space ({self.full_waits} waits so far)")
+        await self._queue.put((name, prefix, row))
+
+    async def close(self, timeout: Optional[float] = 30.0):
+        """Stop accepting rows, wait for every queued row to be written and stop the workers"""
+        self._closed = True
+        if not self._tasks:
+            return
+
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            log.error(f"Timed out draining the write queue, {self._queue.qsize()} row(s) were not written")
+
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def stats(self) -> Dict[str, Any]:
+        """Get queue depth and throughput counters"""
+        return {
+            'queued': self._queue.qsize(),
+            'maxsize': self._queue.maxsize,
+            'written': self.written,
+            'batches': self.batches,
+            'failed': self.failed,
+            'dropped': self.dropped,
+            'full_waits': self.full_waits
+        }
+
+    async def _worker(self):
+        while True:
+            batch = [await self._queue.get()]
+            while len(batch) < self.batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+
+            try:
+                await self._write_batch(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _write_batch(self, batch: List[QueuedWrite]):
+        """Write a batch grouped by statement prefix, falling back to row by row if a group fails"""
+        groups: Dict[Tuple[str, str], List[Sequence[Any]]] = {}
+        for name, prefix, row in batch:
+            groups.setdefault((name, prefix), []).append(row)
+
+        for (name, prefix), rows in groups.items():
+            try:
+                await self._insert(name, prefix, rows)
+            except Exception as e:
+                log.warning(f"Batched write of {len(rows)} {name} row(s) failed, retrying individually: {e}")
+                for row in rows:
+                    try:
+                        await self._insert(name, prefix, [row])
+                    except Exception as e:
+                        self.failed += 1
+                        log.error(f"Dropped queued {name} row after write failure: {e}")
+
+    async def _insert(self, name: str, prefix: str, rows: List[Sequence[Any]]):
+        placeholders = "(" + ", ".join(["%s"] * len(rows[0])) + ")"
+        start = time.perf_counter()
+        failed = True
+        try:
+            async with self.database.acquire() as conn:
+                async with conn.cursor() as cursor:
+                    await cursor.execute(
+                        f"{prefix} {', '.join([placeholders] * len(rows))}",
+                        [value for row in rows for value in row]
+                    )
+            failed = False
+        finally:
+            self.database.query_metrics.record(f"queued:{name}", time.perf_counter() - start, len(rows), failed=failed)
+
+        self.written += len(rows)
+        self.batches += 1
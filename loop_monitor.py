@@ -0,0 +1,154 @@
+import time
+import asyncio
+import logging
+from collections import deque
+from contextvars import ContextVar
+from typing import Deque, Dict, List, Optional, Tuple
+
+from database.instrumentation import QueryStats
+
+log = logging.getLogger(__name__)
+
+# The listener, message handler or command the current task is running on behalf of.
+# Tasks copy the context they are created in, so work they spawn is attributed to them too.
+current_handler: ContextVar[Optional[str]] = ContextVar('current_handler', default=None)
+
+def describe_callback(handle: asyncio.Handle) -> str:
+    """Name the coroutine or function behind an event loop callback"""
+    callback = handle._callback
+    owner = getattr(callback, '__self__', None)
+    if isinstance(owner, asyncio.Task):
+        name = owner.get_name()
+        if name.startswith('Task-'):
+            coro = owner.get_coro()
+            return getattr(coro, '__qualname__', name)
+        return name
+    return getattr(callback, '__qualname__', repr(callback))
+
+class SlowCallbackStats:
+    def __init__(self):
+        self.count = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self.last_seen = 0.0
+
+    def record(self, duration: float):
+        self.count += 1
+        self.total_time += duration
+        self.max_time = max(self.max_time, duration)
+        self.last_seen = time.time()
+
+class LoopMonitor:
+    """Measures event loop scheduling delay and, when attribute_callbacks is enabled, attributes
+    callbacks that block the loop to the listener, message handler or command that scheduled them.
+
+    Attribution times every callback by patching asyncio's private Handle._run for the whole process,
+    which adds overhead to each callback, so it is off by default. Without it, asyncio's debug mode
+    still logs callbacks slower than the loop's slow_callback_duration, just without attribution."""
+
+    def __init__(self, slow_callback_threshold: float = 0.1, lag_interval: float = 0.5,
+                 max_offenders: int = 100, max_recent: int = 50, log_interval: float = 60.0,
+                 attribute_callbacks: bool = False):
+        self.slow_callback_threshold = slow_callback_threshold
+        self.attribute_callbacks = attribute_callbacks
+        self.lag_interval = lag_interval
+        self.max_offenders = max_offenders
+        self.log_interval = log_interval
+        self.lag = QueryStats()
+        self.last_lag = 0.0
+        self.offenders: Dict[Tuple[str, str], SlowCallbackStats] = {}
+        self.recent: Deque[Tuple[float, str, str, float]] = deque(maxlen=max_recent)
+        self._last_logged: Dict[Tuple[str, str], float] = {}
+        self._original_run = None
+        self._lag_task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._lag_task is not None
+
+    def start(self):
+        """Start sampling loop lag and, if enabled, timing every callback the loop runs"""
+        if self.running:
+            return
+
+        if self.attribute_callbacks:
+            loop = asyncio.get_running_loop()
+            if not isinstance(loop, asyncio.BaseEventLoop):
+                log.info(f"{type(loop).__name__} does not run callbacks through asyncio.Handle, slow callbacks will not be attributed")
+            self._install()
+        self._lag_task = asyncio.create_task(self._sample_lag(), name="loop-monitor: lag")
+
+    def stop(self):
+        if self._lag_task is not None:
+            self._lag_task.cancel()
+            self._lag_task = None
+        self._uninstall()
+
+    def _install(self):
+        # Handle._run is where asyncio runs every callback and measures slow ones in debug mode.
+        # Loops that do not use asyncio.Handle, such as uvloop, still get lag sampling but no attribution.
+        if self._original_run is not None:
+            return
+
+        original_run = self._original_run = asyncio.events.Handle._run
+        monitor = self
+
+        def _run(handle):
+            handler = handle._context.get(current_handler)
+            start = time.perf_counter()
+            try:
+                original_run(handle)
+            finally:
+                duration = time.perf_counter() - start
+                if duration >= monitor.slow_callback_threshold:
+                    monitor.record_slow_callback(handle, handler or handle._context.get(current_handler), duration)
+
+        asyncio.events.Handle._run = _run
+
+    def _uninstall(self):
+        if self._original_run is not None:
+            asyncio.events.Handle._run = self._original_run
+            self._original_run = None
+
+    async def _sample_lag(self):
+        """Measure how late the loop wakes up from a sleep, which is how long callbacks kept it busy"""
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.lag_interval
+            await asyncio.sleep(self.lag_interval)
+            self.last_lag = max(0.0, loop.time() - expected)
+            self.lag.record(self.last_lag, 0)
+
+    def record_slow_callback(self, handle: asyncio.Handle, handler: Optional[str], duration: float):
+        try:
+            callback = describe_callback(handle)
+        except Exception:
+            callback = repr(handle)
+        handler = handler or "unattributed"
+        key = (handler, callback)
+
+        stats = self.offenders.get(key)
+        if stats is None:
+            if len(self.offenders) >= self.max_offenders:
+                # Forget the offender that has blocked the loop the least to make room
+                del self.offenders[min(self.offenders, key=lambda k: self.offenders[k].total_time)]
+            stats = self.offenders[key] = SlowCallbackStats()
+        stats.record(duration)
+        self.recent.append((time.time(), handler, callback, duration))
+
+        now = time.monotonic()
+        if now - self._last_logged.get(key, 0.0) >= self.log_interval:
+            self._last_logged[key] = now
+            log.warning(f"Slow callback: {callback} ({handler}) blocked the event loop for {duration * 1000:.0f}ms")
+
+    def worst_offenders(self, limit: int = 10) -> List[Tuple[str, str, SlowCallbackStats]]:
+        """Get the callbacks that have blocked the loop for the longest in total"""
+        ordered = sorted(self.offenders.items(), key=lambda item: item[1].total_time, reverse=True)
+        return [(handler, callback, stats) for (handler, callback), stats in ordered[:limit]]
+
+    def reset(self):
+        self.lag = QueryStats()
+        self.last_lag = 0.0
+        self.offenders.clear()
+        self.recent.clear()
+        self._last_logged.clear()
@@ -2,9 +2,16 @@ import discord
 from discord.ext import commands
 
 import os
+import json
+import time
+import asyncio
+import hashlib
 import logging
 from dotenv import load_dotenv
-from database import Database
+from database import Database, create_backend
+from message_pipeline import MessagePipeline
+from metrics import BotMetrics, InstrumentedCommandTree, MetricsServer
+from loop_monitor import LoopMonitor, current_handler
 from logging_configuration import setup_logging
 
 load_dotenv()
@@ -12,47 +19,232 @@ load_dotenv()
 setup_logging()
 log = logging.getLogger(__name__)
 
+def create_database():
+    """Create the Database from env settings, without connecting it yet"""
+    return Database(
+        create_backend(),
+        config_cache_ttl=float(os.getenv("DB_CONFIG_CACHE_TTL", 300)),
+        follower_cache_size=int(os.getenv("DB_FOLLOWER_CACHE_SIZE", 5000)),
+        slow_query_threshold=float(os.getenv("DB_SLOW_QUERY_MS", 250)) / 1000,
+        write_queue_size=int(os.getenv("DB_WRITE_QUEUE_SIZE", 1000)),
+        write_queue_workers=int(os.getenv("DB_WRITE_QUEUE_WORKERS", 2)),
+        upvote_flush_interval=float(os.getenv("DB_UPVOTE_FLUSH_INTERVAL", 10)),
+        activity_buffer_limit=int(os.getenv("DB_ACTIVITY_BUFFER_LIMIT", 50000))
+    )
+
+class HytaleBot(commands.Bot):
+    def __init__(self, *args, **kwargs):
+        self.metrics = BotMetrics()
+        kwargs.setdefault("tree_cls", InstrumentedCommandTree)
+        kwargs.setdefault("http_trace", self.metrics.trace_config())
+        super().__init__(*args, **kwargs)
+        self.database = None
+        self.metrics_server = None
+        self.loop_monitor = LoopMonitor(
+            slow_callback_threshold=float(os.getenv("LOOP_SLOW_CALLBACK_MS", 100)) / 1000,
+            attribute_callbacks=os.getenv("LOOP_ATTRIBUTE_CALLBACKS", "").lower() in ("1", "true", "yes")
+        )
+        self.message_pipeline = MessagePipeline()
+        self.cog_load_times = {}
+        self.failed_cogs = {}
+        self.startup_timings = {}
+        self.tree_synced = False
+        self.online_migrations_task = None
+
+    async def setup_hook(self):
+        """Connect and migrate the database and warm its caches before loading cogs,
+        so no listener or command can run against a database that is not ready"""
+        start = time.perf_counter()
+        self.loop_monitor.start()
+        self.database = create_database()
+        try:
+            await self.database.init_db()
+        except Exception as e:
+            log.critical(f"A critical error occurred while initializing the database: {e}")
+            raise
+        self.startup_timings.update(self.database.startup_timings)
+
+        cogs_start = time.perf_counter()
+        await self.load_cogs()
+        self.startup_timings['cogs'] = time.perf_counter() - cogs_start
+
+        await self.start_metrics()
+        self.online_migrations_task = asyncio.create_task(self.run_online_migrations(), name="online-migrations")
+
+        log.info(f"Startup finished in {(time.perf_counter() - start) * 1000:.0f}ms ({', '.join(f'{phase} {duration * 1000:.0f}ms' for phase, duration in self.startup_timings.items())})")
+
+    async def run_online_migrations(self):
+        """Apply online migrations once the bot is connected, so copying a large table does not hold up startup"""
+        await self.wait_until_ready()
+        try:
+            applied = await self.database.run_online_migrations()
+        except Exception as e:
+            log.error(f"Online migrations failed, they will resume on the next start: {e}")
+            return
+        if applied:
+            log.info(f"Applied {len(applied)} online migration(s) in the background")
+
+    async def load_cogs(self):
+        """Load every extension in ./cogs concurrently, recording how long each took"""
+        extensions = sorted(f"cogs.{filename[:-3]}" for filename in os.listdir("./cogs") if filename.endswith(".py"))
+        start = time.perf_counter()
+        await asyncio.gather(*(self._load_cog(extension) for extension in extensions))
+
+        loaded = len(extensions) - len(self.failed_cogs)
+        log.info(f"Loaded {loaded}/{len(extensions)} cogs in {(time.perf_counter() - start) * 1000:.0f}ms")
+        if self.failed_cogs:
+            log.error(f"Failed to load cogs: {', '.join(sorted(self.failed_cogs))}")
+
+    async def _load_cog(self, extension: str):
+        start = time.perf_counter()
+        try:
+            await self.load_extension(extension)
+        except Exception as e:
+            self.failed_cogs[extension] = e
+            log.exception(f"Failed to load cog {extension}: {e}")
+            return
+
+        self.cog_load_times[extension] = time.perf_counter() - start
+        log.info(f"Loaded cog: {extension} in {self.cog_load_times[extension] * 1000:.0f}ms")
+
+    async def start_metrics(self):
+        """Serve /metrics on METRICS_PORT, unless it is set to 0"""
+        port = int(os.getenv("METRICS_PORT", 8000))
+        if not port:
+            return
+
+        self.metrics_server = MetricsServer(self, os.getenv("METRICS_HOST", "0.0.0.0"), port)
+        try:
+            await self.metrics_server.start()
+        except OSError as e:
+            log.error(f"Could not serve metrics on port {port}: {e}")
+            self.metrics_server = None
+
+    async def _run_event(self, coro, event_name, *args, **kwargs):
+        # Every listener and @bot.event handler runs in its own task through here,
+        # so time them all in one place and attribute anything that blocks the loop to them
+        listener = getattr(coro, '__qualname__', event_name)
+        current_handler.set(f"event:{listener}")
+        start = time.perf_counter()
+        failed = False
+        try:
+            await coro(*args, **kwargs)
+        except asyncio.CancelledError:
+            pass
+        except Exception:
+            failed = True
+            try:
+                await self.on_error(event_name, *args, **kwargs)
+            except asyncio.CancelledError:
+                pass
+        finally:
+            self.metrics.record_event(event_name, listener, time.perf_counter() - start, failed)
+
+    def command_tree_hash(self, guild=None) -> str:
+        """Hash the serialized slash commands and context menus that a sync would upload"""
+        payload = sorted(
+            (command.to_dict(self.tree) for command in self.tree.get_commands(guild=guild)),
+            key=lambda command: (command.get('type', 1), command['name'])
+        )
+        return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+    async def sync_tree(self):
+        """Sync the command tree, globally or to SYNC_GUILD_ID, unless it is unchanged since the last sync"""
+        guild_id = os.getenv("SYNC_GUILD_ID")
+        guild = discord.Object(id=int(guild_id)) if guild_id else None
+        if guild is not None:
+            self.tree.copy_global_to(guild=guild)
+
+        path = os.getenv("COMMAND_TREE_HASH_PATH", ".command_tree_hash")
+        scope = f"{self.application_id}:{guild_id or 'global'}"
+        fingerprint = self.command_tree_hash(guild)
+
+        try:
+            with open(path) as f:
+                hashes = json.load(f)
+        except (OSError, ValueError):
+            hashes = {}
+
+        if hashes.get(scope) == fingerprint:
+            log.info(f"Command tree unchanged ({fingerprint[:12]}), skipping {guild_id or 'global'} sync")
+            return
+
+        start = time.perf_counter()
+        synced = await self.tree.sync(guild=guild)
+        log.info(f"Synced {len(synced)} command(s) to {guild_id or 'global'} in {(time.perf_counter() - start) * 1000:.0f}ms")
+
+        hashes[scope] = fingerprint
+        try:
+            with open(path, "w") as f:
+                json.dump(hashes, f, indent=2)
+        except OSError as e:
+            log.warning(f"Could not save command tree hash to {path}: {e}")
+
+    async def close(self):
+        await super().close()
+
+        if self.online_migrations_task is not None:
+            # Progress is saved after every chunk, so a cancelled copy resumes on the next start
+            self.online_migrations_task.cancel()
+            await asyncio.gather(self.online_migrations_task, return_exceptions=True)
+
+        self.loop_monitor.stop()
+        if self.metrics_server is not None:
+            await self.metrics_server.close()
+
+        if self.database is not None:
+            await self.database.close()
+
 intents = discord.Intents.all()
-bot = commands.Bot(command_prefix=".", intents=intents)
+bot = HytaleBot(command_prefix=".", intents=intents)
 
 bot.version = "v1.0"
 bot.upload_token = os.getenv("UPLOAD_TOKEN")
 
-async def load_cogs():
-    for filename in os.listdir("./cogs"):
-        if filename.endswith(".py"):
-            await bot.load_extension(f"cogs.{filename[:-3]}")
-            log.info(f"Loaded cog: {filename}")
-
-@bot.event
-async def on_connect():
-    await load_cogs()
-    log.info("All cogs loaded.")
-
 @bot.event
 async def on_ready():
-    host = os.getenv("DB_HOST", "localhost")
-    port = int(os.getenv("DB_PORT", 3306))
-    user = os.getenv("DB_USER")
-    password = os.getenv("DB_PASSWORD")
-    database = os.getenv("DB_NAME")
-    bot.database = Database(host, port, user, password, database)
+    # on_ready also fires after the gateway resumes, so everything here has to be safe to repeat
     bot.staff_role = bot.get_guild(1440173445039132724).get_role(1440793371529449614) # TODO: optimize
-    try:
-        await bot.database.init_db()
-    except Exception as e:
-        log.critical(f"A critical error occurred while initializing the database: {e}")
-        await bot.close()
-        return
-
     log.info(f"{bot.user} is ready!")
 
-    await bot.tree.sync()
+    if not bot.tree_synced:
+        await bot.sync_tree()
+        bot.tree_synced = True
+
+@bot.event
+async def on_app_command_completion(interaction: discord.Interaction, command):
+    bot.metrics.record_command(interaction)
 
 @bot.event
 async def on_command_error(ctx: commands.Context, error: commands.CommandError):
     if isinstance(error, commands.CommandNotFound):
         pass
 
+def event_loop_factory():
+    """Get uvloop's loop factory when USE_UVLOOP is set and uvloop is installed, otherwise None for asyncio's default loop"""
+    if os.getenv("USE_UVLOOP", "").lower() not in ("1", "true", "yes"):
+        return None
+
+    try:
+        import uvloop
+    except ImportError:
+        log.warning("USE_UVLOOP is set but uvloop is not installed, falling back to the default asyncio event loop")
+        return None
+    return uvloop.new_event_loop
+
+async def main():
+    loop = asyncio.get_running_loop()
+    loop.slow_callback_duration = bot.loop_monitor.slow_callback_threshold
+    log.info(f"Running on {type(loop).__module__}.{type(loop).__name__}{' in debug mode' if loop.get_debug() else ''}")
+
+    async with bot:
+        await bot.start(os.getenv("TOKEN"))
+
 if __name__ == "__main__":
-    bot.run(token=os.getenv("TOKEN"), log_handler=None)
+    # ASYNCIO_DEBUG turns on asyncio's debug mode, which also logs every callback slower than LOOP_SLOW_CALLBACK_MS
+    debug = os.getenv("ASYNCIO_DEBUG", "").lower() in ("1", "true", "yes")
+    with asyncio.Runner(debug=debug, loop_factory=event_loop_factory()) as runner:
+        try:
+            runner.run(main())
+        except KeyboardInterrupt:
+            pass
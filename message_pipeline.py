@@ -0,0 +1,132 @@
+import discord
+
+import time
+import asyncio
+import logging
+from functools import cached_property
+from typing import Awaitable, Callable, Dict, FrozenSet, List, Optional
+
+import message_scanner
+from database.instrumentation import QueryStats
+from loop_monitor import current_handler
+
+log = logging.getLogger(__name__)
+
+# Handler priorities, lowest first. Automod runs before everything that replies to a message.
+PRIORITY_STATISTICS = 0
+PRIORITY_AUTOMOD = 10
+PRIORITY_AUTO_THREAD = 20
+PRIORITY_TAGS = 30
+PRIORITY_LINK_EMBEDS = 40
+PRIORITY_GITHUB_REFS = 50
+PRIORITY_DEFAULT = 100
+
+class MessageContext:
+    """A message parsed once and shared by every handler in the pipeline"""
+
+    def __init__(self, message: discord.Message):
+        self.message = message
+        self.content = message.content
+        self.author_id = message.author.id
+        self.channel_id = message.channel.id
+        self.guild_id = message.guild.id if message.guild else None
+
+    @cached_property
+    def role_ids(self) -> FrozenSet[int]:
+        """IDs of the author's roles, empty outside of guilds"""
+        return frozenset(role.id for role in getattr(self.message.author, 'roles', ()))
+
+    @cached_property
+    def is_admin(self) -> bool:
+        permissions = getattr(self.message.author, 'guild_permissions', None)
+        return bool(permissions and permissions.administrator)
+
+    @cached_property
+    def scan(self) -> message_scanner.ScanResult:
+        """Links and references in the content, found in one pass shared by every handler"""
+        return message_scanner.scan(self.content)
+
+MessageHandlerCallback = Callable[[MessageContext], Awaitable[Optional[bool]]]
+MessagePrefilter = Callable[[MessageContext], bool]
+
+class MessageHandler:
+    def __init__(self, name: str, callback: MessageHandlerCallback, prefilter: Optional[MessagePrefilter], priority: int,
+                 concurrent: bool = False):
+        self.name = name
+        self.callback = callback
+        self.prefilter = prefilter
+        self.priority = priority
+        self.concurrent = concurrent
+
+class MessagePipeline:
+    """Runs registered message handlers in priority order from a single on_message listener.
+
+    Handlers only run when their prefilter accepts the message, and a handler that returns True
+    (for example automod after deleting the message) stops the handlers after it.
+
+    Concurrent handlers, typically ones waiting on network requests, are started in a task when
+    their turn comes so they do not hold up the handlers after them. They still only start if no
+    earlier handler stopped the message, but their own return value cannot stop anything."""
+
+    def __init__(self):
+        self._handlers: List[MessageHandler] = []
+        self.timings: Dict[str, QueryStats] = {}
+
+    def register(self, name: str, callback: MessageHandlerCallback, prefilter: Optional[MessagePrefilter] = None,
+                 priority: int = PRIORITY_DEFAULT, concurrent: bool = False):
+        """Register a handler, replacing any handler with the same name"""
+        self.unregister(name)
+        self._handlers.append(MessageHandler(name, callback, prefilter, priority, concurrent))
+        self._handlers.sort(key=lambda handler: handler.priority)
+
+    def unregister(self, name: str):
+        self._handlers = [handler for handler in self._handlers if handler.name != name]
+
+    @property
+    def handlers(self) -> List[str]:
+        return [handler.name for handler in self._handlers]
+
+    async def dispatch(self, message: discord.Message):
+        """Run the matching handlers for a message, skipping messages from bots"""
+        if message.author.bot:
+            return
+
+        ctx = MessageContext(message)
+        started: List[asyncio.Task] = []
+        for handler in self._handlers:
+            try:
+                if handler.prefilter is not None and not handler.prefilter(ctx):
+                    continue
+            except Exception as e:
+                log.exception(f"Error in message prefilter {handler.name}: {e}")
+                continue
+
+            if handler.concurrent:
+                started.append(asyncio.create_task(self._run(handler, ctx), name=f"message: {handler.name}"))
+            elif await self._run(handler, ctx):
+                break
+
+        if started:
+            await asyncio.gather(*started)
+
+    async def _run(self, handler: MessageHandler, ctx: MessageContext) -> bool:
+        """Run one handler, timing it and attributing its callbacks to it. Returns whether it stopped the message."""
+        token = current_handler.set(f"message:{handler.name}")
+        start = time.perf_counter()
+        failed = False
+        try:
+            stop = await handler.callback(ctx)
+        except Exception as e:
+            failed = True
+            stop = False
+            log.exception(f"Error in message handler {handler.name}: {e}")
+        finally:
+            current_handler.reset(token)
+        self._record(handler.name, time.perf_counter() - start, failed)
+        return bool(stop)
+
+    def _record(self, name: str, duration: float, failed: bool):
+        stats = self.timings.get(name)
+        if stats is None:
+            stats = self.timings[name] = QueryStats(max_samples=256)
+        stats.record(duration, 0, failed)
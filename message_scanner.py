@@ -0,0 +1,57 @@
+import re
+from typing import List, Tuple
+
+# Every pattern the message handlers look for, combined so one pass over the content finds them all
+INVITE = r"(?:https?:\/\/)?(?:www\.)?(?:discord\.gg|discordapp\.com\/invite)\/[a-zA-Z0-9]+"
+MESSAGE_LINK = r"https://discord\.com/channels/(?P<link_guild>\d+)/(?P<link_channel>\d+)/(?P<link_message>\d+)"
+TWITTER_LINK = r"https://(?:(?:www\.)?(?:twitter|x)\.com|vxtwitter\.com|fxtwitter\.com|nitter\.net)(?P<twitter_path>/\S+)"
+GITHUB_REF = r"(?P<github_repo>\w+)#(?P<github_id>[a-fA-F0-9]+|\d+)"
+
+SCANNER = re.compile(
+    f"(?P<message_link>{MESSAGE_LINK})"
+    f"|(?P<twitter_link>{TWITTER_LINK})"
+    f"|(?P<invite>{INVITE})"
+    f"|(?P<github_ref>{GITHUB_REF})"
+)
+INVITE_PATTERN = re.compile(INVITE)
+
+# Every match contains at least one of these, so content without any of them skips the regex engine
+LITERALS = ("http", "#", "discord")
+
+class ScanResult:
+    """All pattern hits in a message, in the order they appear"""
+
+    __slots__ = ('invites', 'message_links', 'twitter_paths', 'github_refs')
+
+    def __init__(self):
+        self.invites: List[str] = []
+        self.message_links: List[Tuple[int, int, int]] = []
+        self.twitter_paths: List[str] = []
+        self.github_refs: List[Tuple[str, str]] = []
+
+    def __bool__(self) -> bool:
+        return bool(self.invites or self.message_links or self.twitter_paths or self.github_refs)
+
+def scan(content: str) -> ScanResult:
+    """Find invites, message links, Twitter/X links and repo#123 references in one pass.
+    Matches do not overlap, so e.g. a repo#123 inside a link is part of the link, not a reference."""
+    result = ScanResult()
+    if not any(literal in content for literal in LITERALS):
+        return result
+
+    for match in SCANNER.finditer(content):
+        kind = match.lastgroup
+        if kind == 'message_link':
+            result.message_links.append((int(match['link_guild']), int(match['link_channel']), int(match['link_message'])))
+        elif kind == 'twitter_link':
+            result.twitter_paths.append(match['twitter_path'])
+        elif kind == 'invite':
+            result.invites.append(match['invite'])
+        else:
+            result.github_refs.append((match['github_repo'], match['github_id']))
+
+    # An invite can hide inside another match (x.com/discord.gg/..., repo#12discord.gg/...),
+    # so automod does not rely on the combined pass alone
+    if not result.invites and ("discord.gg" in content or "discordapp.com/invite" in content):
+        result.invites = INVITE_PATTERN.findall(content)
+    return result
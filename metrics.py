@@ -0,0 +1,272 @@
+import discord
+from discord import app_commands
+
+import math
+import time
+import types
+import logging
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+import aiohttp
+from aiohttp import web
+
+from database.instrumentation import LATENCY_BUCKETS, QueryStats
+from loop_monitor import current_handler
+
+log = logging.getLogger(__name__)
+
+CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+
+def count_member_statuses(guild: discord.Guild) -> Dict[str, int]:
+    """Count the human members of a guild by presence status"""
+    counts = {'online': 0, 'idle': 0, 'dnd': 0, 'offline': 0}
+    for member in guild.members:
+        if member.bot:
+            continue
+
+        if member.status == discord.Status.online:
+            counts['online'] += 1
+        elif member.status == discord.Status.idle:
+            counts['idle'] += 1
+        elif member.status == discord.Status.dnd:
+            counts['dnd'] += 1
+        else:
+            counts['offline'] += 1
+    return counts
+
+def escape_label(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def format_labels(labels: Dict[str, object]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{escape_label(value)}"' for key, value in labels.items()) + "}"
+
+class OpenMetricsWriter:
+    """Builds an OpenMetrics text exposition, one metric family at a time"""
+
+    def __init__(self):
+        self.lines: List[str] = []
+
+    def family(self, name: str, kind: str, help_text: str):
+        self.lines.append(f"# TYPE {name} {kind}")
+        self.lines.append(f"# HELP {name} {help_text}")
+
+    def sample(self, name: str, value: float, labels: Optional[Dict[str, object]] = None):
+        self.lines.append(f"{name}{format_labels(labels or {})} {value}")
+
+    def histogram(self, name: str, stats: QueryStats, labels: Dict[str, object]):
+        """Write a QueryStats histogram, converting its buckets to cumulative counts"""
+        cumulative = 0
+        for bound, count in zip(LATENCY_BUCKETS, stats.buckets):
+            cumulative += count
+            self.sample(f"{name}_bucket", cumulative, {**labels, 'le': bound})
+        self.sample(f"{name}_bucket", stats.count, {**labels, 'le': "+Inf"})
+        self.sample(f"{name}_sum", stats.total_time, labels)
+        self.sample(f"{name}_count", stats.count, labels)
+
+    def render(self) -> str:
+        return "\n".join(self.lines + ["# EOF"]) + "\n"
+
+class BotMetrics:
+    """Latency histograms and counters for the bot itself, exposed in OpenMetrics format"""
+
+    def __init__(self, member_count_interval: float = 15.0):
+        self.events: Dict[Tuple[str, str], QueryStats] = {}
+        self.commands: Dict[str, QueryStats] = {}
+        self.http_requests: Dict[str, QueryStats] = {}
+        self.http_responses: Counter = Counter()
+        self.http_errors: Counter = Counter()
+        self.http_connections: Counter = Counter()
+        self.member_count_interval = member_count_interval
+        self._member_counts: Dict[int, Dict[str, int]] = {}
+        self._member_counts_at = 0.0
+
+    @staticmethod
+    def _record(histograms: dict, key, duration: float, failed: bool):
+        stats = histograms.get(key)
+        if stats is None:
+            stats = histograms[key] = QueryStats(max_samples=256)
+        stats.record(duration, 0, failed)
+
+    def record_event(self, event_name: str, listener: str, duration: float, failed: bool = False):
+        self._record(self.events, (event_name, listener), duration, failed)
+
+    def record_command(self, interaction: discord.Interaction, failed: bool = False):
+        """Record an app command invocation started by InstrumentedCommandTree.interaction_check"""
+        start = interaction.extras.pop('metrics_start', None)
+        if start is None:
+            return
+        command = interaction.command.qualified_name if interaction.command else "unknown"
+        self._record(self.commands, command, time.perf_counter() - start, failed)
+
+    def trace_config(self) -> aiohttp.TraceConfig:
+        """Create a TraceConfig that records request latency and connection reuse of an aiohttp session"""
+        async def on_request_start(session, context, params):
+            context.metrics_start = time.perf_counter()
+
+        async def on_request_end(session, context, params):
+            self._record(self.http_requests, params.method, time.perf_counter() - context.metrics_start, False)
+            self.http_responses[(params.method, params.response.status)] += 1
+
+        async def on_request_exception(session, context, params):
+            self._record(self.http_requests, params.method, time.perf_counter() - context.metrics_start, True)
+            self.http_errors[(params.method, type(params.exception).__name__)] += 1
+
+        async def on_connection_create_end(session, context, params):
+            self.http_connections['created'] += 1
+
+        async def on_connection_reuseconn(session, context, params):
+            self.http_connections['reused'] += 1
+
+        trace_config = aiohttp.TraceConfig(trace_config_ctx_factory=lambda trace_request_ctx: types.SimpleNamespace(metrics_start=0.0))
+        trace_config.on_request_start.append(on_request_start)
+        trace_config.on_request_end.append(on_request_end)
+        trace_config.on_request_exception.append(on_request_exception)
+        trace_config.on_connection_create_end.append(on_connection_create_end)
+        trace_config.on_connection_reuseconn.append(on_connection_reuseconn)
+        return trace_config
+
+    def member_counts(self, bot: discord.Client) -> Dict[int, Dict[str, int]]:
+        """Member counts by status per guild, recounted at most every member_count_interval seconds"""
+        now = time.monotonic()
+        if now - self._member_counts_at >= self.member_count_interval:
+            self._member_counts = {guild.id: count_member_statuses(guild) for guild in bot.guilds}
+            self._member_counts_at = now
+        return self._member_counts
+
+    def render(self, bot) -> str:
+        writer = OpenMetricsWriter()
+
+        writer.family("bot_event_duration_seconds", "histogram", "Time spent in event listeners")
+        for (event_name, listener), stats in sorted(self.events.items()):
+            writer.histogram("bot_event_duration_seconds", stats, {'event': event_name, 'listener': listener})
+        writer.family("bot_event_errors", "counter", "Event listeners that raised")
+        for (event_name, listener), stats in sorted(self.events.items()):
+            writer.sample("bot_event_errors_total", stats.errors, {'event': event_name, 'listener': listener})
+
+        pipeline = getattr(bot, 'message_pipeline', None)
+        if pipeline is not None:
+            writer.family("bot_message_handler_duration_seconds", "histogram", "Time spent in message pipeline handlers")
+            for handler, stats in sorted(pipeline.timings.items()):
+                writer.histogram("bot_message_handler_duration_seconds", stats, {'handler': handler})
+            writer.family("bot_message_handler_errors", "counter", "Message pipeline handlers that raised")
+            for handler, stats in sorted(pipeline.timings.items()):
+                writer.sample("bot_message_handler_errors_total", stats.errors, {'handler': handler})
+
+        writer.family("bot_command_duration_seconds", "histogram", "Time from receiving an app command to it finishing")
+        for command, stats in sorted(self.commands.items()):
+            writer.histogram("bot_command_duration_seconds", stats, {'command': command})
+        writer.family("bot_command_errors", "counter", "App commands that failed")
+        for command, stats in sorted(self.commands.items()):
+            writer.sample("bot_command_errors_total", stats.errors, {'command': command})
+
+        writer.family("bot_gateway_latency_seconds", "gauge", "Latency between a gateway heartbeat and its acknowledgement")
+        if math.isfinite(bot.latency):
+            writer.sample("bot_gateway_latency_seconds", bot.latency)
+
+        loop_monitor = getattr(bot, 'loop_monitor', None)
+        if loop_monitor is not None:
+            writer.family("bot_event_loop_lag_seconds", "histogram", "How late the event loop woke up from a sleep")
+            writer.histogram("bot_event_loop_lag_seconds", loop_monitor.lag, {})
+            writer.family("bot_event_loop_lag_last_seconds", "gauge", "Most recently measured event loop lag")
+            writer.sample("bot_event_loop_lag_last_seconds", loop_monitor.last_lag)
+            writer.family("bot_slow_callbacks", "counter", "Event loop callbacks over the slow callback threshold")
+            for handler, callback, stats in loop_monitor.worst_offenders(limit=len(loop_monitor.offenders)):
+                writer.sample("bot_slow_callbacks_total", stats.count, {'handler': handler, 'callback': callback})
+
+        writer.family("bot_http_request_duration_seconds", "histogram", "Discord HTTP API request latency")
+        for method, stats in sorted(self.http_requests.items()):
+            writer.histogram("bot_http_request_duration_seconds", stats, {'method': method})
+        writer.family("bot_http_responses", "counter", "Discord HTTP API responses by status")
+        for (method, status), count in sorted(self.http_responses.items()):
+            writer.sample("bot_http_responses_total", count, {'method': method, 'status': status})
+        writer.family("bot_http_errors", "counter", "Discord HTTP API requests that raised")
+        for (method, error), count in sorted(self.http_errors.items()):
+            writer.sample("bot_http_errors_total", count, {'method': method, 'error': error})
+        writer.family("bot_http_connections", "counter", "Discord HTTP API connections created or reused")
+        for kind, count in sorted(self.http_connections.items()):
+            writer.sample("bot_http_connections_total", count, {'kind': kind})
+
+        database = getattr(bot, 'database', None)
+        if database is not None:
+            histograms = database.query_metrics.histograms()
+            writer.family("bot_db_method_duration_seconds", "histogram", "Database method latency, including calls answered from in-memory caches")
+            for method, stats in sorted(histograms.items()):
+                writer.histogram("bot_db_method_duration_seconds", stats, {'method': method})
+            writer.family("bot_db_method_errors", "counter", "Database methods that raised")
+            for method, stats in sorted(histograms.items()):
+                writer.sample("bot_db_method_errors_total", stats.errors, {'method': method})
+            writer.family("bot_db_method_rows", "counter", "Rows returned by database methods")
+            for method, stats in sorted(histograms.items()):
+                writer.sample("bot_db_method_rows_total", stats.rows, {'method': method})
+
+            caches = {'config': database.config_cache_stats(), 'followers': database.follower_cache_stats()}
+            writer.family("bot_cache_hits", "counter", "Cache lookups that hit")
+            for cache, stats in caches.items():
+                writer.sample("bot_cache_hits_total", stats['hits'], {'cache': cache})
+            writer.family("bot_cache_misses", "counter", "Cache lookups that missed")
+            for cache, stats in caches.items():
+                writer.sample("bot_cache_misses_total", stats['misses'], {'cache': cache})
+            writer.family("bot_cache_hit_ratio", "gauge", "Share of cache lookups that hit")
+            for cache, stats in caches.items():
+                writer.sample("bot_cache_hit_ratio", stats['hit_ratio'], {'cache': cache})
+            writer.family("bot_cache_entries", "gauge", "Entries held by a cache")
+            for cache, stats in caches.items():
+                writer.sample("bot_cache_entries", stats['size'], {'cache': cache})
+
+            write_queue = database.write_queue.stats()
+            writer.family("bot_write_queue_depth", "gauge", "Rows waiting in the database write queue")
+            writer.sample("bot_write_queue_depth", write_queue['queued'])
+            writer.family("bot_write_queue_rows", "counter", "Rows handled by the database write queue")
+            writer.sample("bot_write_queue_rows_total", write_queue['written'], {'result': 'written'})
+            writer.sample("bot_write_queue_rows_total", write_queue['failed'], {'result': 'failed'})
+            writer.sample("bot_write_queue_rows_total", write_queue['dropped'], {'result': 'dropped'})
+
+        writer.family("bot_guild_members", "gauge", "Human guild members by presence status")
+        for guild_id, counts in sorted(self.member_counts(bot).items()):
+            for status, count in counts.items():
+                writer.sample("bot_guild_members", count, {'guild': guild_id, 'status': status})
+        writer.family("bot_guild_member_count", "gauge", "Total guild members including bots")
+        for guild in bot.guilds:
+            writer.sample("bot_guild_member_count", guild.member_count or 0, {'guild': guild.id})
+
+        return writer.render()
+
+class InstrumentedCommandTree(app_commands.CommandTree):
+    """Command tree that times every app command it receives and attributes its work to it"""
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        interaction.extras['metrics_start'] = time.perf_counter()
+        current_handler.set(f"command:{interaction.command.qualified_name if interaction.command else 'unknown'}")
+        return True
+
+    async def on_error(self, interaction: discord.Interaction, error: app_commands.AppCommandError):
+        self.client.metrics.record_command(interaction, failed=True)
+        await super().on_error(interaction, error)
+
+class MetricsServer:
+    """Serves BotMetrics over HTTP at /metrics for Prometheus to scrape"""
+
+    def __init__(self, bot, host: str = "0.0.0.0", port: int = 8000):
+        self.bot = bot
+        self.host = host
+        self.port = port
+        self._runner: Optional[web.AppRunner] = None
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get("/metrics", self.handle_metrics)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        log.info(f"Serving metrics on http://{self.host}:{self.port}/metrics")
+
+    async def close(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def handle_metrics(self, request: web.Request) -> web.Response:
+        return web.Response(body=self.bot.metrics.render(self.bot).encode(), headers={'Content-Type': CONTENT_TYPE})